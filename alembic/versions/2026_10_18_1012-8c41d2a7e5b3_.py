@@ -0,0 +1,38 @@
+"""farm session accrual rules
+
+Revision ID: 8c41d2a7e5b3
+Revises: 2d17909d0fbf
+Create Date: 2026-10-18 10:12:04.118233
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41d2a7e5b3'
+down_revision: Union[str, None] = '2d17909d0fbf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('farm_sessions', sa.Column('base_gain', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('farm_sessions', sa.Column('multiplier_interval', sa.Integer(), nullable=False, server_default='5'))
+    op.add_column('farm_sessions', sa.Column('settled_minutes', sa.Integer(), nullable=False, server_default='0'))
+    # The per-minute worker committed each minute's resources and energy as it ended, so in-progress
+    # sessions have already been credited for every whole minute since they started.
+    op.execute(
+        "UPDATE farm_sessions "
+        "SET settled_minutes = GREATEST(0, floor("
+        "extract(epoch FROM LEAST(LOCALTIMESTAMP, end_time) - start_time) / 60)) "
+        "WHERE status = 'in_progress'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('farm_sessions', 'settled_minutes')
+    op.drop_column('farm_sessions', 'multiplier_interval')
+    op.drop_column('farm_sessions', 'base_gain')
@@ -0,0 +1,57 @@
+"""indexes for hot lookup paths
+
+Revision ID: 5f2b9c6e1a47
+Revises: 8c41d2a7e5b3
+Create Date: 2026-10-18 11:40:27.503118
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2b9c6e1a47'
+down_revision: Union[str, None] = '8c41d2a7e5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_players_map_object_id', 'players', ['map_object_id'], None),
+    ('ix_players_recovery', 'players', ['id'], "status = 'recovery'"),
+    ('ix_player_stats_player_id', 'player_stats', ['player_id'], None),
+    ('ix_players_bases_owner_id', 'players_bases', ['owner_id'], None),
+    ('ix_farm_sessions_in_progress', 'farm_sessions', ['player_id', 'map_id'], "status = 'in_progress'"),
+    ('ix_players_resources_player_id_resource_id', 'players_resources', ['player_id', 'resource_id'], None),
+    ('ix_players_resources_storage_player_id_resource_id', 'players_resources_storage',
+     ['player_id', 'resource_id'], None),
+    ('ix_players_resources_storage_player_base_id', 'players_resources_storage', ['player_base_id'], None),
+    ('ix_inventories_player_id', 'inventories', ['player_id'], None),
+    ('ix_equip_items_player_id', 'equip_items', ['player_id'], None),
+    ('ix_players_items_storage_player_base_id', 'players_items_storage', ['player_base_id'], None),
+    ('ix_map_objects_map_id', 'map_objects', ['map_id'], None),
+    ('ix_map_objects_position_map_object_id', 'map_objects_position', ['map_object_id'], None),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the tables writable while the indexes build, but can't run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,41 @@
+"""spatial index on map object positions
+
+Revision ID: b7d3e0f49c21
+Revises: 5f2b9c6e1a47
+Create Date: 2026-10-18 14:15:42.870214
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e0f49c21'
+down_revision: Union[str, None] = '5f2b9c6e1a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_map_objects_position_box',
+            'map_objects_position',
+            [sa.text('box(point(x1, y1), point(x2, y2))')],
+            unique=False,
+            postgresql_using='gist',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_map_objects_position_box',
+            table_name='map_objects_position',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
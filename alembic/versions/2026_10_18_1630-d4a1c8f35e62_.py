@@ -0,0 +1,43 @@
+"""lazy energy and health regeneration
+
+Revision ID: d4a1c8f35e62
+Revises: b7d3e0f49c21
+Create Date: 2026-10-18 16:30:12.418537
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a1c8f35e62'
+down_revision: Union[str, None] = 'b7d3e0f49c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('players', sa.Column('regen_rate', sa.Integer(), server_default='0', nullable=False))
+    op.add_column(
+        'players', sa.Column('regen_updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False)
+    )
+    op.execute("UPDATE players SET regen_rate = 1 WHERE status = 'recovery'")
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_players_recovery', table_name='players', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_players_recovery',
+            'players',
+            ['id'],
+            unique=False,
+            postgresql_where=sa.text("status = 'recovery'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.drop_column('players', 'regen_updated_at')
+    op.drop_column('players', 'regen_rate')
@@ -0,0 +1,53 @@
+"""inventory used slots counter
+
+Revision ID: e8b27f40d913
+Revises: d4a1c8f35e62
+Create Date: 2026-10-18 18:10:37.562104
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b27f40d913'
+down_revision: Union[str, None] = 'd4a1c8f35e62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('players', sa.Column('used_slots', sa.Integer(), server_default='0', nullable=False))
+    # Inventory writes wait until the trigger exists and the backfill is committed.
+    op.execute("LOCK TABLE inventories IN SHARE MODE")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION inventories_used_slots() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE players SET used_slots = used_slots - 1 WHERE id = OLD.player_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE players SET used_slots = used_slots + 1 WHERE id = NEW.player_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER inventories_used_slots
+        AFTER INSERT OR DELETE OR UPDATE OF player_id ON inventories
+        FOR EACH ROW EXECUTE FUNCTION inventories_used_slots()
+    """)
+    op.execute(
+        "UPDATE players SET used_slots = counts.used_slots "
+        "FROM (SELECT player_id, count(*) AS used_slots FROM inventories GROUP BY player_id) AS counts "
+        "WHERE players.id = counts.player_id"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS inventories_used_slots ON inventories")
+    op.execute("DROP FUNCTION IF EXISTS inventories_used_slots()")
+    op.drop_column('players', 'used_slots')
@@ -0,0 +1,41 @@
+"""index on the end time of in-progress farm sessions
+
+Revision ID: a3c5e7f90b12
+Revises: e8b27f40d913
+Create Date: 2026-10-18 22:40:11.204937
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f90b12'
+down_revision: Union[str, None] = 'e8b27f40d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_farm_sessions_in_progress_end_time',
+            'farm_sessions',
+            ['end_time'],
+            unique=False,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text("status = 'in_progress'"),
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_farm_sessions_in_progress_end_time',
+            table_name='farm_sessions',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
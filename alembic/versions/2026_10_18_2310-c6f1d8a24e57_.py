@@ -0,0 +1,41 @@
+"""skip used slots updates that don't move an inventory row
+
+Revision ID: c6f1d8a24e57
+Revises: a3c5e7f90b12
+Create Date: 2026-10-18 23:10:52.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f1d8a24e57'
+down_revision: Union[str, None] = 'a3c5e7f90b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Both statements run in the migration transaction, so no inventory write sees neither trigger.
+    op.execute("DROP TRIGGER IF EXISTS inventories_used_slots ON inventories")
+    op.execute("""
+        CREATE TRIGGER inventories_used_slots
+        AFTER INSERT OR DELETE ON inventories
+        FOR EACH ROW EXECUTE FUNCTION inventories_used_slots()
+    """)
+    op.execute("""
+        CREATE TRIGGER inventories_used_slots_move
+        AFTER UPDATE OF player_id ON inventories
+        FOR EACH ROW WHEN (OLD.player_id IS DISTINCT FROM NEW.player_id) EXECUTE FUNCTION inventories_used_slots()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS inventories_used_slots_move ON inventories")
+    op.execute("DROP TRIGGER IF EXISTS inventories_used_slots ON inventories")
+    op.execute("""
+        CREATE TRIGGER inventories_used_slots
+        AFTER INSERT OR DELETE OR UPDATE OF player_id ON inventories
+        FOR EACH ROW EXECUTE FUNCTION inventories_used_slots()
+    """)
@@ -0,0 +1,95 @@
+"""shared map version moved by triggers
+
+Revision ID: f2b9d06c4a18
+Revises: c6f1d8a24e57
+Create Date: 2026-10-18 23:35:14.902117
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b9d06c4a18'
+down_revision: Union[str, None] = 'c6f1d8a24e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('maps', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_version_bump() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE maps SET version = version + 1 WHERE id = OLD.map_id;
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.map_id IS DISTINCT FROM OLD.map_id) THEN
+                UPDATE maps SET version = version + 1 WHERE id = NEW.map_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_position_version_bump() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE maps SET version = version + 1
+                WHERE id = (SELECT map_id FROM map_objects WHERE id = OLD.map_object_id);
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.map_object_id IS DISTINCT FROM OLD.map_object_id) THEN
+                UPDATE maps SET version = version + 1
+                WHERE id = (SELECT map_id FROM map_objects WHERE id = NEW.map_object_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_size_version_bump() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER maps_version
+        BEFORE UPDATE OF height, width ON maps
+        FOR EACH ROW EXECUTE FUNCTION map_size_version_bump()
+    """)
+    op.execute("""
+        CREATE TRIGGER map_objects_version
+        AFTER INSERT OR DELETE OR UPDATE ON map_objects
+        FOR EACH ROW EXECUTE FUNCTION map_version_bump()
+    """)
+    op.execute("""
+        CREATE TRIGGER map_objects_position_version
+        AFTER INSERT OR DELETE OR UPDATE ON map_objects_position
+        FOR EACH ROW EXECUTE FUNCTION map_position_version_bump()
+    """)
+    op.execute("""
+        CREATE TRIGGER resources_zones_version
+        AFTER INSERT OR DELETE OR UPDATE ON resources_zones
+        FOR EACH ROW EXECUTE FUNCTION map_version_bump()
+    """)
+    op.execute("""
+        CREATE TRIGGER players_bases_version
+        AFTER INSERT OR DELETE OR UPDATE OF map_id, map_object_id, owner_id ON players_bases
+        FOR EACH ROW EXECUTE FUNCTION map_version_bump()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS players_bases_version ON players_bases")
+    op.execute("DROP TRIGGER IF EXISTS resources_zones_version ON resources_zones")
+    op.execute("DROP TRIGGER IF EXISTS map_objects_position_version ON map_objects_position")
+    op.execute("DROP TRIGGER IF EXISTS map_objects_version ON map_objects")
+    op.execute("DROP TRIGGER IF EXISTS maps_version ON maps")
+    op.execute("DROP FUNCTION IF EXISTS map_size_version_bump()")
+    op.execute("DROP FUNCTION IF EXISTS map_position_version_bump()")
+    op.execute("DROP FUNCTION IF EXISTS map_version_bump()")
+    op.drop_column('maps', 'version')
@@ -0,0 +1,165 @@
+"""map change log in postgres
+
+Revision ID: b7e3a91d5c20
+Revises: f2b9d06c4a18
+Create Date: 2026-10-18 23:50:27.114386
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3a91d5c20'
+down_revision: Union[str, None] = 'f2b9d06c4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSION_TRIGGERS = (
+    ('map_objects_version', 'map_objects', 'AFTER INSERT OR DELETE OR UPDATE', 'map_version_bump()'),
+    ('map_objects_position_version', 'map_objects_position', 'AFTER INSERT OR DELETE OR UPDATE',
+     'map_position_version_bump()'),
+    ('resources_zones_version', 'resources_zones', 'AFTER INSERT OR DELETE OR UPDATE', 'map_version_bump()'),
+    ('players_bases_version', 'players_bases', 'AFTER INSERT OR DELETE OR UPDATE OF map_id, map_object_id, owner_id',
+     'map_version_bump()'),
+)
+
+CHANGE_TRIGGERS = (
+    ('map_objects_change', 'map_objects', 'AFTER INSERT OR DELETE OR UPDATE', 'map_objects_change()'),
+    ('map_objects_position_change', 'map_objects_position', 'AFTER INSERT OR DELETE OR UPDATE',
+     'map_objects_position_change()'),
+    ('resources_zones_change', 'resources_zones', 'AFTER INSERT OR DELETE OR UPDATE',
+     "map_object_row_change('zone_set')"),
+    ('players_bases_change', 'players_bases', 'AFTER INSERT OR DELETE OR UPDATE OF map_id, map_object_id, owner_id',
+     "map_object_row_change('owner_set')"),
+)
+
+
+def _create_triggers(triggers) -> None:
+    for name, table, events, function in triggers:
+        op.execute(f"CREATE TRIGGER {name} {events} ON {table} FOR EACH ROW EXECUTE FUNCTION {function}")
+
+
+def _drop_triggers(triggers) -> None:
+    for name, table, _, _ in triggers:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+
+
+def upgrade() -> None:
+    op.create_table('map_changes',
+    sa.Column('map_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('map_object_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['map_id'], ['maps.id'], ),
+    sa.PrimaryKeyConstraint('map_id', 'version')
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION record_map_change(
+            changed_map_id integer, change_type text, changed_object_id integer
+        ) RETURNS void AS $$
+        DECLARE
+            new_version integer;
+        BEGIN
+            UPDATE maps SET version = version + 1 WHERE id = changed_map_id RETURNING version INTO new_version;
+            IF new_version IS NULL THEN
+                RETURN;
+            END IF;
+            INSERT INTO map_changes (map_id, version, type, map_object_id)
+            VALUES (changed_map_id, new_version, change_type, changed_object_id);
+            DELETE FROM map_changes WHERE map_id = changed_map_id AND version <= new_version - 1000;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_objects_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.map_id = OLD.map_id THEN
+                PERFORM record_map_change(NEW.map_id, 'object_updated', NEW.id);
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                PERFORM record_map_change(OLD.map_id, 'object_deleted', OLD.id);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM record_map_change(NEW.map_id, 'object_created', NEW.id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_objects_position_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                PERFORM record_map_change(map_id, 'position_set', id) FROM map_objects WHERE id = OLD.map_object_id;
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.map_object_id <> OLD.map_object_id) THEN
+                PERFORM record_map_change(map_id, 'position_set', id) FROM map_objects WHERE id = NEW.map_object_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_object_row_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND (NEW.map_id, NEW.map_object_id) = (OLD.map_id, OLD.map_object_id) THEN
+                PERFORM record_map_change(NEW.map_id, TG_ARGV[0], NEW.map_object_id);
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                PERFORM record_map_change(OLD.map_id, TG_ARGV[0], OLD.map_object_id);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM record_map_change(NEW.map_id, TG_ARGV[0], NEW.map_object_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # Both sets of triggers are swapped in the migration transaction, so no map write is missed.
+    _drop_triggers(VERSION_TRIGGERS)
+    _create_triggers(CHANGE_TRIGGERS)
+    op.execute("DROP FUNCTION IF EXISTS map_position_version_bump()")
+    op.execute("DROP FUNCTION IF EXISTS map_version_bump()")
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_version_bump() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE maps SET version = version + 1 WHERE id = OLD.map_id;
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.map_id IS DISTINCT FROM OLD.map_id) THEN
+                UPDATE maps SET version = version + 1 WHERE id = NEW.map_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION map_position_version_bump() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE maps SET version = version + 1
+                WHERE id = (SELECT map_id FROM map_objects WHERE id = OLD.map_object_id);
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.map_object_id IS DISTINCT FROM OLD.map_object_id) THEN
+                UPDATE maps SET version = version + 1
+                WHERE id = (SELECT map_id FROM map_objects WHERE id = NEW.map_object_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    _drop_triggers(CHANGE_TRIGGERS)
+    _create_triggers(VERSION_TRIGGERS)
+    op.execute("DROP FUNCTION IF EXISTS map_object_row_change()")
+    op.execute("DROP FUNCTION IF EXISTS map_objects_position_change()")
+    op.execute("DROP FUNCTION IF EXISTS map_objects_change()")
+    op.execute("DROP FUNCTION IF EXISTS record_map_change(integer, text, integer)")
+    op.drop_table('map_changes')
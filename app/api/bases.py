@@ -1,12 +1,12 @@
 from typing import Annotated
 
 from aiogram.utils.web_app import WebAppUser
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_async_session
 from app.depends.deps import get_user_data_from_request
-from app.schemas.building import BuildingCostResponseSchema, BuildingType
+from app.schemas.building import BuildingCostResponseSchema, BuildingType, FreePlacementSchema
 from app.schemas.player import PlayerBaseCreateSchema, PlayerBaseSchema
 from app.services.building import BuildingService
 
@@ -30,3 +30,15 @@ async def build_base(
         session: Annotated[AsyncSession, Depends(get_async_session)]
 ) -> PlayerBaseSchema:
     return await BuildingService(session).create_base(user.id, object_data)
+
+
+@router.get("/free-places/", response_model=list[FreePlacementSchema])
+async def get_free_places_for_base(
+        map_id: int,
+        user: Annotated[WebAppUser, Depends(get_user_data_from_request)],
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        x: int | None = Query(None, ge=0),
+        y: int | None = Query(None, ge=0),
+        limit: int = Query(5, ge=1, le=50),
+) -> list[FreePlacementSchema]:
+    return await BuildingService(session).suggest_placements(user.id, map_id, x, y, limit)
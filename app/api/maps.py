@@ -1,11 +1,12 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Path, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_async_session
-from app.schemas.map import BaseMapSchema, MapResponseSchema
-from app.services.map import MapService
+from app.schemas.map import (BaseMapSchema, MapChangesSchema, MapObjectOccupancySchema, MapResponseSchema,
+                             MapTileSchema)
+from app.services.map import MapService, map_response_cache
 
 router = APIRouter(prefix="/maps", tags=["Maps"])
 
@@ -19,9 +20,59 @@ async def get_maps(
     return await MapService(session).get_maps(offset, limit)
 
 
-@router.get("/{map_id}/", response_model=MapResponseSchema)
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+@router.get("/{map_id}/", response_model=MapResponseSchema, responses={304: {"description": "Map not modified"}})
 async def get_map(
+        map_id: int,
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    # Only the map version is read before answering an unchanged map.
+    service = MapService(session)
+    version = await service.get_version(map_id)
+    etag = map_response_cache.etag(map_id, version)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = await service.get_map_body(map_id, version)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/{map_id}/occupancy/", response_model=list[MapObjectOccupancySchema])
+async def get_map_occupancy(
         map_id: int,
         session: Annotated[AsyncSession, Depends(get_async_session)]
-) -> MapResponseSchema:
-    return await MapService(session).get_map_with_objects(map_id)
+) -> list[MapObjectOccupancySchema]:
+    return await MapService(session).get_occupancy(map_id)
+
+
+@router.get(
+    "/{map_id}/tiles/{x}/{y}/", response_model=MapTileSchema, responses={304: {"description": "Tile not modified"}}
+)
+async def get_map_tile(
+        map_id: int,
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        x: int = Path(ge=0),
+        y: int = Path(ge=0),
+        if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    service = MapService(session)
+    version = await service.get_version(map_id)
+    etag = map_response_cache.etag(map_id, version, (x, y))
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = await service.get_tile_body(map_id, x, y, version)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/{map_id}/changes/", response_model=MapChangesSchema)
+async def get_map_changes(
+        map_id: int,
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        since: int = Query(0, ge=0),
+) -> MapChangesSchema:
+    return await MapService(session).get_changes(map_id, since)
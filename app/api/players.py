@@ -7,10 +7,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_async_session
 from app.depends.deps import get_user_data_from_request
-from app.schemas.player import (BasePlayerSchema, PlayerCreateSchema,
-                                PlayerMoveResponseSchema, PlayerMoveSchema,
+from app.schemas.player import (BasePlayerSchema, BulkTransferResponseSchema, BulkTransferSchema,
+                                PlayerCreateSchema, PlayerMoveResponseSchema, PlayerMoveSchema,
                                 PlayerSchema)
 from app.services.player import PlayerService
+from app.services.transfer import BulkTransferService
 
 router = APIRouter(prefix="/players", tags=["Players"])
 
@@ -48,3 +49,12 @@ async def move_player(
         session: Annotated[AsyncSession, Depends(get_async_session)]
 ) -> PlayerMoveResponseSchema:
     return await PlayerService(session).move(user.id, player_data)
+
+
+@router.patch("/transfer/", response_model=BulkTransferResponseSchema)
+async def transfer(
+        transfer_data: BulkTransferSchema,
+        user: Annotated[WebAppUser, Depends(get_user_data_from_request)],
+        session: Annotated[AsyncSession, Depends(get_async_session)]
+) -> BulkTransferResponseSchema:
+    return await BulkTransferService(session).transfer(user.id, transfer_data)
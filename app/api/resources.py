@@ -2,9 +2,10 @@ from typing import Annotated
 
 from aiogram.utils.web_app import WebAppUser
 from fastapi import APIRouter, Depends
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_async_session
+from app.core.database import get_async_session, get_redis
 from app.depends.deps import get_user_data_from_request
 from app.schemas import (ResourceSchema, StartFarmResourcesSchema,
                          StopFarmResourcesSchema, TransferResourceSchema, PlayerResourcesSchema, FarmSessionSchema)
@@ -23,9 +24,10 @@ async def get_resources(session: Annotated[AsyncSession, Depends(get_async_sessi
 async def start_farm_resources(
         farm_data: StartFarmResourcesSchema,
         user: Annotated[WebAppUser, Depends(get_user_data_from_request)],
-        session: Annotated[AsyncSession, Depends(get_async_session)]
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        redis: Annotated[Redis, Depends(get_redis)],
 ) -> FarmSessionSchema:
-    return await FarmingService(session).start_farming(farm_data, user.id)
+    return await FarmingService(session, redis).start_farming(farm_data, user.id)
 
 
 @router.patch("/farm/stop/")
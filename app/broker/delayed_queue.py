@@ -0,0 +1,72 @@
+import json
+import time
+from datetime import datetime
+
+from redis.asyncio import Redis
+
+# Claims every due job (up to ARGV[2]) by pushing its score to the visibility deadline, so the
+# claim is atomic across workers and a job that is never acked becomes due again.
+CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local jobs = {}
+for _, job_id in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[3], job_id)
+    table.insert(jobs, job_id)
+    table.insert(jobs, redis.call('HGET', KEYS[2], job_id) or 'null')
+end
+return jobs
+"""
+
+
+class DelayedQueue:
+    """Jobs that become due at a given time, stored in a Redis sorted set scored by due timestamp.
+
+    Payloads live in a hash next to it as plain JSON. A claimed job stays in the set with its score moved
+    visibility_timeout seconds ahead until it is acked, which gives at-least-once delivery.
+    """
+
+    def __init__(self, redis: Redis, name: str, visibility_timeout: int = 60):
+        self.redis = redis
+        self.due_key = f"{name}:due"
+        self.payload_key = f"{name}:jobs"
+        self.visibility_timeout = visibility_timeout
+        self._claim = redis.register_script(CLAIM_SCRIPT)
+
+    async def schedule(self, job_id: str, payload: dict, run_at: datetime) -> None:
+        await self.schedule_many([(job_id, payload, run_at)])
+
+    async def schedule_many(self, jobs: list[tuple[str, dict, datetime]], only_new: bool = False) -> None:
+        """Add or reschedule jobs; with only_new, jobs already queued (or claimed) keep their due time."""
+        if not jobs:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.payload_key, mapping={job_id: json.dumps(payload) for job_id, payload, _ in jobs})
+            pipe.zadd(self.due_key, {job_id: run_at.timestamp() for job_id, _, run_at in jobs}, nx=only_new)
+            await pipe.execute()
+
+    async def claim(self, limit: int) -> list[tuple[str, dict]]:
+        now = time.time()
+        result = await self._claim(
+            keys=[self.due_key, self.payload_key], args=[now, limit, now + self.visibility_timeout]
+        )
+        return [
+            (self._decode(job_id), json.loads(payload))
+            for job_id, payload in zip(result[::2], result[1::2])
+        ]
+
+    async def ack(self, *job_ids: str) -> None:
+        if not job_ids:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.due_key, *job_ids)
+            pipe.hdel(self.payload_key, *job_ids)
+            await pipe.execute()
+
+    async def next_due(self) -> float | None:
+        """Timestamp of the earliest job, claimed ones included."""
+        earliest = await self.redis.zrange(self.due_key, 0, 0, withscores=True)
+        return earliest[0][1] if earliest else None
+
+    @staticmethod
+    def _decode(value: bytes | str) -> str:
+        return value.decode() if isinstance(value, bytes) else value
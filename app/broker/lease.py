@@ -0,0 +1,44 @@
+import uuid
+
+from redis.asyncio import Redis
+
+# Extends the lease only while this holder still owns it, so a holder that stalled past the ttl
+# can't take the lease back from whoever acquired it in the meantime.
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLease:
+    """Time-limited ownership of a Redis key, used to run a job on one replica at a time.
+
+    The holder has to call hold() again before ttl runs out. If it dies, the key expires and
+    another replica takes the lease on its next hold().
+    """
+
+    def __init__(self, redis: Redis, name: str, ttl: float):
+        self.redis = redis
+        self.key = f"lease:{name}"
+        self.ttl_ms = int(ttl * 1000)
+        self.token = uuid.uuid4().hex
+        self._renew = redis.register_script(RENEW_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    async def hold(self) -> bool:
+        """Acquire the lease or extend it if this instance already holds it."""
+        if await self._renew(keys=[self.key], args=[self.token, self.ttl_ms]):
+            return True
+        return bool(await self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    async def release(self) -> None:
+        await self._release(keys=[self.key], args=[self.token])
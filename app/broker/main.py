@@ -1,51 +1,195 @@
 import asyncio
 import json
-from datetime import datetime
+import os
+import socket
+import time
+from datetime import datetime, timedelta
 
-from apscheduler.jobstores.redis import RedisJobStore
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from redis.exceptions import ResponseError
 
-from app.broker.scheduler_tasks.regenerate_energy import regenerate
-from app.broker.task import start_farm_session
-from app.core import config
-from app.core.database import redis_client
+from app.broker.delayed_queue import DelayedQueue
+from app.broker.lease import RedisLease
+from app.broker.task import complete_farm_session
+from app.core.config import FARM_TASK_STREAM
+from app.core.database import async_session_maker, create_async_redis
+from app.repository import get_farm_session_end_times, get_overdue_farm_sessions
 
-jobstores = {
-    'default': RedisJobStore(
-        host=config.REDIS_HOST,
-        port=config.REDIS_PORT,
-        db=config.REDIS_DB,
-    )
-}
+FARM_TASK_GROUP = "scheduler"
+FARM_TASK_BATCH_SIZE = 500
+FARM_TASK_BLOCK_MS = 5000
+FARM_TASK_CLAIM_IDLE_MS = 60000
+FARM_TASK_CLAIM_INTERVAL = 60
+FARM_QUEUE_BATCH_SIZE = 100
+MAX_IDLE_SECONDS = 5
+FARM_SWEEP_INTERVAL = 60
+FARM_SWEEP_BATCH_SIZE = 1000
+
+redis = create_async_redis()
+farm_queue = DelayedQueue(redis, "farm_sessions")
+farm_queue_changed = asyncio.Event()
+
+
+def _text(value: bytes | str | int) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _farm_job(task_data: dict) -> tuple[str, dict, datetime]:
+    task_data = {_text(key): _text(value) for key, value in task_data.items()}
+    farm_session_id = int(task_data["farm_session_id"])
+    return str(farm_session_id), {"farm_session_id": farm_session_id}, datetime.fromisoformat(task_data["end_time"])
 
-scheduler = AsyncIOScheduler(jobstores=jobstores)
 
-scheduler.add_job(regenerate, 'interval', seconds=60, id='regenerate_energy', replace_existing=True)
+async def drain_legacy_task_queue():
+    """Queue the sessions started before the switch to the stream, which still wait in the old list.
+
+    Those entries predate end_time in the payload, so it is read from the session; entries of
+    sessions that are no longer in progress are dropped.
+    """
+    farm_session_ids = []
+    while task_data_json := await redis.lpop('task_queue'):
+        try:
+            farm_session_ids.append(int(json.loads(task_data_json)["farm_session_id"]))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping malformed legacy farm task {_text(task_data_json)}: {e!r}")
+    if not farm_session_ids:
+        return
+    async with async_session_maker() as session:
+        end_times = await get_farm_session_end_times(session, farm_session_ids)
+    jobs = [(str(farm_session_id), {"farm_session_id": farm_session_id}, end_time)
+            for farm_session_id, end_time in end_times]
+    await farm_queue.schedule_many(jobs)
+    farm_queue_changed.set()
+
+
+async def schedule_stream_entries(entries: list) -> None:
+    jobs = []
+    for entry_id, fields in entries:
+        # Entries trimmed from the stream while pending come back without fields; they are only acked.
+        if not fields:
+            continue
+        try:
+            jobs.append(_farm_job(fields))
+        except (KeyError, ValueError) as e:
+            print(f"Skipping malformed farm task {_text(entry_id)}: {e!r}")
+    await farm_queue.schedule_many(jobs)
+    await redis.xack(FARM_TASK_STREAM, FARM_TASK_GROUP, *(entry_id for entry_id, _ in entries))
+    farm_queue_changed.set()
+
+
+async def reclaim_stale_tasks(consumer: str) -> None:
+    """Take over entries other consumers read but have not acked for FARM_TASK_CLAIM_IDLE_MS.
+
+    Consumer names change with every restart, so this is what picks up the entries of a worker
+    that died between reading and acking them.
+    """
+    start_id = "0-0"
+    while True:
+        response = await redis.xautoclaim(
+            FARM_TASK_STREAM, FARM_TASK_GROUP, consumer, FARM_TASK_CLAIM_IDLE_MS,
+            start_id=start_id, count=FARM_TASK_BATCH_SIZE,
+        )
+        start_id, entries = response[0], response[1]
+        if entries:
+            await schedule_stream_entries(entries)
+        if _text(start_id) == "0-0":
+            return
 
 
 async def process_tasks():
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    try:
+        await redis.xgroup_create(FARM_TASK_STREAM, FARM_TASK_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    await drain_legacy_task_queue()
+
+    # "0" re-reads what this consumer took but never acked; ">" then blocks for new entries.
+    last_id = "0"
+    next_reclaim = 0.0
+    while True:
+        if time.monotonic() >= next_reclaim:
+            await reclaim_stale_tasks(consumer)
+            next_reclaim = time.monotonic() + FARM_TASK_CLAIM_INTERVAL
+        response = await redis.xreadgroup(
+            FARM_TASK_GROUP, consumer, {FARM_TASK_STREAM: last_id}, count=FARM_TASK_BATCH_SIZE, block=FARM_TASK_BLOCK_MS
+        )
+        entries = response[0][1] if response else []
+        if not entries:
+            last_id = ">"
+            continue
+        await schedule_stream_entries(entries)
+
+
+async def dispatch_farm_sessions():
     while True:
-        task_data_json = redis_client.lpop('task_queue')
-        if task_data_json:
-            task_data = json.loads(task_data_json)
+        jobs = await farm_queue.claim(FARM_QUEUE_BATCH_SIZE)
+        if jobs:
+            results = await asyncio.gather(
+                *(complete_farm_session(payload["farm_session_id"]) for _, payload in jobs), return_exceptions=True
+            )
+            done = []
+            for (job_id, _), result in zip(jobs, results):
+                if isinstance(result, Exception):
+                    # Left unacked, so it is claimed again once the visibility timeout runs out.
+                    print(f"Farm session job {job_id} failed: {result!r}")
+                else:
+                    done.append(job_id)
+            await farm_queue.ack(*done)
+            continue
+
+        # Sleep until the earliest job is due or a new one is scheduled, whichever comes first.
+        farm_queue_changed.clear()
+        next_due = await farm_queue.next_due()
+        timeout = MAX_IDLE_SECONDS if next_due is None else min(max(next_due - time.time(), 0), MAX_IDLE_SECONDS)
+        try:
+            await asyncio.wait_for(farm_queue_changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
 
-            scheduler.add_job(start_farm_session, 'date',
-                              run_date=datetime.now(),
-                              args=[
-                                  task_data['total_minutes'],
-                                  task_data['farm_session_id'],
-                                  task_data['resource_id'],
-                                  task_data['player_id'],
-                                  task_data["resources_before_farming"],
-                              ],
-                              misfire_grace_time=None)
 
-        await asyncio.sleep(1)
+async def sweep_overdue_farm_sessions():
+    """Queue in-progress sessions that ended a while ago but never reached the queue.
+
+    That covers sessions whose stream entry was lost and the ones still waiting on the old
+    APScheduler date jobs. Sessions that are queued or being completed right now are left alone.
+    """
+    before = datetime.now() - timedelta(seconds=FARM_SWEEP_INTERVAL)
+    async with async_session_maker() as session:
+        overdue = await get_overdue_farm_sessions(session, before, FARM_SWEEP_BATCH_SIZE)
+    if overdue:
+        jobs = [(str(farm_session_id), {"farm_session_id": farm_session_id}, end_time)
+                for farm_session_id, end_time in overdue]
+        await farm_queue.schedule_many(jobs, only_new=True)
+        farm_queue_changed.set()
+
+
+async def run_singleton(name: str, job, interval: float):
+    """Run job every interval seconds on whichever replica holds the lease.
+
+    The lease outlives a couple of missed ticks, so a slow run doesn't hand the job over, while a
+    dead replica's lease expires and another one picks the job up.
+    """
+    lease = RedisLease(redis, name, ttl=interval * 3)
+    try:
+        while True:
+            try:
+                if await lease.hold():
+                    await job()
+            except Exception as e:
+                print(f"Singleton job {name} failed: {e!r}")
+            await asyncio.sleep(interval)
+    finally:
+        await lease.release()
 
 
 async def run_scheduler():
-    scheduler.start()
-    await process_tasks()
+    # Every replica consumes the stream and claims due jobs; periodic jobs run on one replica only.
+    await asyncio.gather(
+        process_tasks(),
+        dispatch_farm_sessions(),
+        run_singleton("sweep_overdue_farm_sessions", sweep_overdue_farm_sessions, FARM_SWEEP_INTERVAL),
+    )
 
 
 if __name__ == "__main__":
@@ -1,5 +1,4 @@
-import asyncio
-import random
+from datetime import datetime
 
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
@@ -8,39 +7,33 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.bot.bot import bot
 from app.core.database import async_session_maker
 from app.models import FarmSession, Player, PlayerResources
-from app.repository import (farm_session_repository, player_repository,
-                            player_resource_repository, repository_resource, get_player_with_specific_resource)
+from app.repository import farm_session_repository, load_player, repository_resource
 from app.services import FarmingService
 from app.services.base import BaseService
+from app.services.resource import ResourceService
 
 
-async def start_farm_session(
-        total_minutes: int,
-        farm_session_id: int,
-        resource_id: int,
-        player_id: int,
-        resources_before_farming: int
-):
+async def complete_farm_session(farm_session_id: int):
     async with async_session_maker() as session:
         farm_session = await farm_session_repository.get_by_id(session, farm_session_id)
-        multiplier = 1
-        for minute in range(total_minutes):
-            try:
-                await FarmingService.update_player_resources_while_farming(
-                    session, resource_id, player_id, minute, multiplier
-                )
-            except ValueError:
-                break
-
-        farm_session.status = "completed"
-        player = await player_repository.get_by_id(session, player_id)
-        player.status = "waiting"
+        if not farm_session or farm_session.status != "in_progress":
+            return
+        # Settlement reloads the energy, status and resources it needs under the player row lock.
+        player = await load_player(session, player_id=farm_session.player_id)
+        if not await FarmingService(session).settle_farm_session(
+            player, farm_session, now=max(datetime.now(), farm_session.end_time)
+        ):
+            # Completed by a concurrent settlement in the meantime, which also credited it.
+            return
+        telegram_id = player.player_id
+        resource_id = farm_session.resource_id
+        resource_count = ResourceService.get_resource_count_after_farming(
+            farm_session.settled_minutes, farm_session.base_gain, farm_session.multiplier_interval
+        )
         await BaseService.commit_or_rollback(session)
 
-        message = await success_farm(session, player_id, resource_id, resources_before_farming)
-        await bot.send_message(player.player_id, message, parse_mode="html")
-
-
+        message = await success_farm(session, resource_id, resource_count)
+        await bot.send_message(telegram_id, message, parse_mode="html")
 
 
 # async def farm_session_task(task_data: dict):
@@ -69,17 +62,11 @@ async def start_farm_session(
 #         await bot.send_message(player.player_id, message, parse_mode="html")
 
 
-async def success_farm(session, player_id: int, resource_id: int, resources_before_farming: int):
-    player_resource = await player_resource_repository.get(
-        session,
-        player_id=player_id,
-        resource_id=resource_id
-    )
-    resource_new_count = player_resource.resource_quantity - resources_before_farming
-    resource = await repository_resource.get_by_id(session, player_resource.resource_id)
+async def success_farm(session, resource_id: int, resource_count: int):
+    resource = await repository_resource.get_by_id(session, resource_id)
     message = (f'<b>✨ Фарм завершён успешно! ✨</b>\n\n\n'
                f'<b>🧑🏻‍🎤Персонаж</b> успешно завершил фарм и добыл ресурсы:\n'
-               f'<b>{resource.icon}{resource.name}</b> - {resource_new_count}')
+               f'<b>{resource.icon}{resource.name}</b> - {resource_count}')
     return message
 
 
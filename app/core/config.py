@@ -19,10 +19,22 @@ REDIS_HOST = os.environ.get("REDIS_HOST")
 REDIS_PORT = os.environ.get("REDIS_PORT")
 REDIS_DB = os.environ.get("REDIS_DB")
 REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD")
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
 
 DEV = os.environ.get('DEV', 'False') == 'True'
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
+INIT_DATA_TTL = int(os.environ.get("INIT_DATA_TTL", 86400))
+INIT_DATA_CACHE_SIZE = int(os.environ.get("INIT_DATA_CACHE_SIZE", 10000))
+MAP_TILE_SIZE = int(os.environ.get("MAP_TILE_SIZE", 32))
+# Bases take BASE_SIZE x BASE_SIZE map cells.
+BASE_SIZE = 2
+# Versions each map keeps in map_changes; the record_map_change function trims to it.
+MAP_CHANGE_LOG_SIZE = 1000
+MAP_RESPONSE_CACHE_SIZE = int(os.environ.get("MAP_RESPONSE_CACHE_SIZE", 10000))
+
+FARM_TASK_STREAM = "farm_tasks"
+FARM_TASK_STREAM_MAXLEN = int(os.environ.get("FARM_TASK_STREAM_MAXLEN", 100000))
 
 
 APP_URL = os.environ.get("APP_URL")
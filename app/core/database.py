@@ -1,6 +1,8 @@
 from typing import AsyncGenerator
 
-from apscheduler.jobstores import redis
+from fastapi import Request
+from redis.asyncio import BlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
 from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
                                     create_async_engine)
 
@@ -11,13 +13,26 @@ TEST_DATABASE_URL = f"postgresql+asyncpg://{config.TEST_DB_USER}:{config.TEST_DB
 
 test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
 engine = create_async_engine(DATABASE_URL, echo=False)
-async_session_maker = async_sessionmaker(bind=engine, class_=AsyncSession)
+async_session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 
-redis_client = redis.Redis(host=config.REDIS_HOST, port=config.REDIS_PORT, db=config.REDIS_DB, password=config.REDIS_PASSWORD)
-
+def create_async_redis() -> AsyncRedis:
+    # Blocking pool: when every connection is busy, callers wait for one instead of failing.
+    pool = BlockingConnectionPool(
+        host=config.REDIS_HOST,
+        port=config.REDIS_PORT,
+        db=config.REDIS_DB,
+        password=config.REDIS_PASSWORD,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        timeout=5,
+    )
+    return AsyncRedis.from_pool(pool)
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+async def get_redis(request: Request) -> AsyncRedis:
+    return request.app.state.redis
@@ -1,3 +1,6 @@
+import time
+from collections import OrderedDict
+
 from aiogram.utils.web_app import WebAppUser, safe_parse_webapp_init_data
 from fastapi import HTTPException, Request, Security
 from fastapi.security import APIKeyHeader
@@ -9,13 +12,59 @@ from app.core.config import BOT_TOKEN
 api_key_header = APIKeyHeader(name="Authorization")
 
 
-def check_auth(api_key: str = Security(api_key_header)) -> WebAppUser:
+class InitDataCache:
+    """LRU of already verified initData strings, each kept until auth_date + ttl."""
+
+    def __init__(self, ttl: int, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[WebAppUser, float]] = OrderedDict()
+
+    def get(self, init_data: str) -> WebAppUser | None:
+        entry = self._entries.get(init_data)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[init_data]
+            return None
+        self._entries.move_to_end(init_data)
+        return user
+
+    def set(self, init_data: str, user: WebAppUser, auth_date: float) -> None:
+        expires_at = auth_date + self.ttl
+        if expires_at <= time.time():
+            return
+        self._entries[init_data] = (user, expires_at)
+        self._entries.move_to_end(init_data)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+init_data_cache = InitDataCache(ttl=config.INIT_DATA_TTL, max_size=config.INIT_DATA_CACHE_SIZE)
+
+
+def verify_init_data(init_data: str) -> WebAppUser:
+    user = init_data_cache.get(init_data)
+    if user is not None:
+        return user
+    try:
+        data = safe_parse_webapp_init_data(BOT_TOKEN, init_data)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    init_data_cache.set(init_data, data.user, data.auth_date.timestamp())
+    return data.user
+
+
+def check_auth(request: Request, api_key: str = Security(api_key_header)) -> WebAppUser:
+    user: WebAppUser | None = getattr(request.state, "user", None)
+    if user is not None:
+        return user
     if not config.DEV:
-        try:
-            data = safe_parse_webapp_init_data(BOT_TOKEN, api_key)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-        return data.user
+        return verify_init_data(api_key)
     else:
         return WebAppUser(first_name="Tom", username="tom", id=111, photo_url="photo_url_tom")
 
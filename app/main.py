@@ -1,10 +1,11 @@
 from contextlib import asynccontextmanager
 
 from aiogram.utils.web_app import WebAppUser
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.api.bases import router as bases_router
 from app.api.items import router as items_router
@@ -14,7 +15,9 @@ from app.api.resources import router as resources_router
 from app.api.telegram import router as telegram_router
 from app.bot.bot import bot, dp
 from app.core.config import APP_URL, DEV, TG_SECRET
-from app.depends.deps import check_auth
+from app.core.database import async_session_maker, create_async_redis
+from app.depends.deps import check_auth, verify_init_data
+from app.repository import game_catalog
 
 
 @asynccontextmanager
@@ -23,7 +26,11 @@ async def lifespan(app: FastAPI):
     #                       allowed_updates=dp.resolve_used_update_types(),
     #                       drop_pending_updates=True,
     #                       secret_token=TG_SECRET)
+    app.state.redis = create_async_redis()
+    async with async_session_maker() as session:
+        await game_catalog.reload(session)
     yield
+    await app.state.redis.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -36,22 +43,37 @@ app.include_router(router=resources_router, dependencies=[Depends(check_auth)])
 app.include_router(router=telegram_router)
 
 
-class UserMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+AUTH_EXCLUDED_PATHS = {"/docs", "/redoc", "/openapi.json", "/telegram/"}
+
+
+class UserMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         if not DEV:
-            if request.url.path in ["/docs", "/redoc", "/openapi.json", '/telegram/']:
-                return await call_next(request)
-            token = request.headers.get("Authorization")
+            if scope["path"] in AUTH_EXCLUDED_PATHS:
+                await self.app(scope, receive, send)
+                return
+            token = Headers(scope=scope).get("Authorization")
             if not token:
-                return JSONResponse(status_code=401, content={"detail": "Token is missing"})
+                response = JSONResponse(status_code=401, content={"detail": "Token is missing"})
+                await response(scope, receive, send)
+                return
             try:
-                request.state.user = check_auth(token)
+                user = verify_init_data(token)
             except HTTPException:
-                return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+                response = JSONResponse(status_code=401, content={"detail": "Invalid token"})
+                await response(scope, receive, send)
+                return
         else:
-            request.state.user = WebAppUser(first_name="Tom", username="tom", id=111, photo_url="photo_url_tom")
+            user = WebAppUser(first_name="Tom", username="tom", id=111, photo_url="photo_url_tom")
 
-        return await call_next(request)
+        scope.setdefault("state", {})["user"] = user
+        await self.app(scope, receive, send)
 
 
 app.add_middleware(UserMiddleware)
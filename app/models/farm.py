@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy import DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -13,6 +13,14 @@ class FarmSession(Base):
     start_time: Mapped[datetime] = mapped_column(DateTime)
     end_time: Mapped[datetime] = mapped_column(DateTime)
     status: Mapped[str] = mapped_column(default="in_progress")
+    base_gain: Mapped[int] = mapped_column(default=1)
+    multiplier_interval: Mapped[int] = mapped_column(default=5)
+    settled_minutes: Mapped[int] = mapped_column(default=0)
     map_id: Mapped[int] = mapped_column(ForeignKey('maps.id'))
     resource_id: Mapped[int] = mapped_column(ForeignKey('resources.id'))
     player_id: Mapped[int] = mapped_column(ForeignKey('players.id'))
+
+    __table_args__ = (
+        Index('ix_farm_sessions_in_progress', 'player_id', 'map_id', postgresql_where=text("status = 'in_progress'")),
+        Index('ix_farm_sessions_in_progress_end_time', 'end_time', postgresql_where=text("status = 'in_progress'")),
+    )
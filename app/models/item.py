@@ -48,6 +48,6 @@ class EquipItem(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     tier: Mapped[int]
     item_id: Mapped[int] = mapped_column(ForeignKey("items.id"))
-    player_id: Mapped[int] = mapped_column(ForeignKey('players.id'))
+    player_id: Mapped[int] = mapped_column(ForeignKey('players.id'), index=True)
 
     item: Mapped["Item"] = relationship("Item")
@@ -1,6 +1,7 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import DDL, ForeignKey, Index, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.core.config import MAP_CHANGE_LOG_SIZE
 from app.models.base import Base
 from app.models.resource import Resource
 
@@ -11,6 +12,8 @@ class Map(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     height: Mapped[int] = mapped_column(nullable=True)
     width: Mapped[int] = mapped_column(nullable=True)
+    # Moved by the map change triggers below on every change to what the map response shows.
+    version: Mapped[int] = mapped_column(default=0, server_default="0")
 
     map_objects: Mapped[list["MapObject"]] = relationship("MapObject", back_populates="map", uselist=True)
 
@@ -20,13 +23,14 @@ class MapObject(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
-    map_id: Mapped[int] = mapped_column(ForeignKey('maps.id'))
+    map_id: Mapped[int] = mapped_column(ForeignKey('maps.id'), index=True)
     type: Mapped[str]
     is_farmable: Mapped[bool]
 
     map: Mapped["Map"] = relationship("Map", back_populates="map_objects")
     position: Mapped["MapObjectPosition"] = relationship("MapObjectPosition", back_populates="map_object")
-    players: Mapped[list["Player"]] = relationship("Player", back_populates="map_object", uselist=True, lazy="joined")  # type: ignore
+    # Can hold every player standing on the object: load it explicitly or use get_map_occupancy.
+    players: Mapped[list["Player"]] = relationship("Player", back_populates="map_object", uselist=True, lazy="raise")  # type: ignore
     resource_zone: Mapped["ResourcesZone"] = relationship("ResourcesZone", back_populates="map_object")
 
 
@@ -38,10 +42,14 @@ class MapObjectPosition(Base):
     y1: Mapped[int]
     x2: Mapped[int]
     y2: Mapped[int]
-    map_object_id: Mapped[int] = mapped_column(ForeignKey('map_objects.id'))
+    map_object_id: Mapped[int] = mapped_column(ForeignKey('map_objects.id'), index=True)
 
     map_object: Mapped["MapObject"] = relationship("MapObject", back_populates="position")
 
+    __table_args__ = (
+        Index('ix_map_objects_position_box', text('box(point(x1, y1), point(x2, y2))'), postgresql_using='gist'),
+    )
+
 
 class ResourcesZone(Base):
     __tablename__ = 'resources_zones'
@@ -53,3 +61,132 @@ class ResourcesZone(Base):
 
     map_object: Mapped["MapObject"] = relationship("MapObject", back_populates="resource_zone")
     resource: Mapped["Resource"] = relationship("Resource", back_populates="resource_zone")
+
+
+
+class MapChange(Base):
+    __tablename__ = 'map_changes'
+
+    map_id: Mapped[int] = mapped_column(ForeignKey('maps.id'), primary_key=True)
+    version: Mapped[int] = mapped_column(primary_key=True)
+    type: Mapped[str]
+    # Not a foreign key: the log outlives deleted objects.
+    map_object_id: Mapped[int]
+
+
+# Every write that changes a map response moves the map version and logs the change in the same
+# transaction, whichever process, session or admin tool made it, so ETags, cached bodies and
+# /changes/ all follow the committed version. The maps row lock hands out versions in commit order.
+RECORD_MAP_CHANGE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION record_map_change(changed_map_id integer, change_type text, changed_object_id integer)
+RETURNS void AS $$
+DECLARE
+    new_version integer;
+BEGIN
+    UPDATE maps SET version = version + 1 WHERE id = changed_map_id RETURNING version INTO new_version;
+    IF new_version IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO map_changes (map_id, version, type, map_object_id)
+    VALUES (changed_map_id, new_version, change_type, changed_object_id);
+    DELETE FROM map_changes WHERE map_id = changed_map_id AND version <= new_version - {MAP_CHANGE_LOG_SIZE};
+END
+$$ LANGUAGE plpgsql
+"""
+
+MAP_OBJECTS_CHANGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION map_objects_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.map_id = OLD.map_id THEN
+        PERFORM record_map_change(NEW.map_id, 'object_updated', NEW.id);
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM record_map_change(OLD.map_id, 'object_deleted', OLD.id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM record_map_change(NEW.map_id, 'object_created', NEW.id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# Positions only know their map through the map object.
+MAP_POSITIONS_CHANGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION map_objects_position_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM record_map_change(map_id, 'position_set', id) FROM map_objects WHERE id = OLD.map_object_id;
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.map_object_id <> OLD.map_object_id) THEN
+        PERFORM record_map_change(map_id, 'position_set', id) FROM map_objects WHERE id = NEW.map_object_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# For tables with map_id and map_object_id columns; the change type is the trigger argument.
+MAP_OBJECT_ROW_CHANGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION map_object_row_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND (NEW.map_id, NEW.map_object_id) = (OLD.map_id, OLD.map_object_id) THEN
+        PERFORM record_map_change(NEW.map_id, TG_ARGV[0], NEW.map_object_id);
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM record_map_change(OLD.map_id, TG_ARGV[0], OLD.map_object_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM record_map_change(NEW.map_id, TG_ARGV[0], NEW.map_object_id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# A resized map has no object to point clients at: the version moves without a logged change, so
+# every older version falls back to a snapshot.
+MAP_SIZE_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION map_size_version_bump() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+MAP_SIZE_VERSION_TRIGGER = """
+CREATE TRIGGER maps_version
+BEFORE UPDATE OF height, width ON maps
+FOR EACH ROW EXECUTE FUNCTION map_size_version_bump()
+"""
+
+MAP_OBJECTS_CHANGE_TRIGGER = """
+CREATE TRIGGER map_objects_change
+AFTER INSERT OR DELETE OR UPDATE ON map_objects
+FOR EACH ROW EXECUTE FUNCTION map_objects_change()
+"""
+
+MAP_POSITIONS_CHANGE_TRIGGER = """
+CREATE TRIGGER map_objects_position_change
+AFTER INSERT OR DELETE OR UPDATE ON map_objects_position
+FOR EACH ROW EXECUTE FUNCTION map_objects_position_change()
+"""
+
+RESOURCES_ZONES_CHANGE_TRIGGER = """
+CREATE TRIGGER resources_zones_change
+AFTER INSERT OR DELETE OR UPDATE ON resources_zones
+FOR EACH ROW EXECUTE FUNCTION map_object_row_change('zone_set')
+"""
+
+event.listen(Map.__table__, "after_create", DDL(RECORD_MAP_CHANGE_FUNCTION))
+event.listen(Map.__table__, "after_create", DDL(MAP_OBJECTS_CHANGE_FUNCTION))
+event.listen(Map.__table__, "after_create", DDL(MAP_POSITIONS_CHANGE_FUNCTION))
+event.listen(Map.__table__, "after_create", DDL(MAP_OBJECT_ROW_CHANGE_FUNCTION))
+event.listen(Map.__table__, "after_create", DDL(MAP_SIZE_VERSION_FUNCTION))
+event.listen(Map.__table__, "after_create", DDL(MAP_SIZE_VERSION_TRIGGER))
+event.listen(MapObject.__table__, "after_create", DDL(MAP_OBJECTS_CHANGE_TRIGGER))
+event.listen(MapObjectPosition.__table__, "after_create", DDL(MAP_POSITIONS_CHANGE_TRIGGER))
+event.listen(ResourcesZone.__table__, "after_create", DDL(RESOURCES_ZONES_CHANGE_TRIGGER))
@@ -1,4 +1,6 @@
-from sqlalchemy import ForeignKey, UniqueConstraint
+from datetime import datetime
+
+from sqlalchemy import DDL, DateTime, ForeignKey, Index, UniqueConstraint, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import BIGINT
 
@@ -19,9 +21,14 @@ class Player(Base):
     health: Mapped[int] = mapped_column(default=100)
     energy: Mapped[int] = mapped_column(default=100)
     inventory_slots: Mapped[int] = mapped_column(default=10)
+    # Number of inventory rows, kept by the inventories_used_slots trigger below.
+    used_slots: Mapped[int] = mapped_column(default=0, server_default="0")
     status: Mapped[str] = mapped_column(default="waiting")
+    # Energy and health regenerate lazily: regen_rate points per minute since regen_updated_at.
+    regen_rate: Mapped[int] = mapped_column(default=0)
+    regen_updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
     map_id: Mapped[int] = mapped_column(ForeignKey('maps.id'))
-    map_object_id: Mapped[int] = mapped_column(ForeignKey('map_objects.id'), default=1)
+    map_object_id: Mapped[int] = mapped_column(ForeignKey('map_objects.id'), default=1, index=True)
 
     map_object: Mapped["MapObject"] = relationship("MapObject", back_populates="players")
     resources: Mapped[list["PlayerResources"]] = relationship("PlayerResources", uselist=True)
@@ -37,7 +44,7 @@ class Player(Base):
 class PlayerStats(Base):
     __tablename__ = 'player_stats'
     id: Mapped[int] = mapped_column(primary_key=True)
-    player_id: Mapped[int] = mapped_column(ForeignKey('players.id'))
+    player_id: Mapped[int] = mapped_column(ForeignKey('players.id'), index=True)
     damage: Mapped[int] = mapped_column(default=0)
     armor: Mapped[int] = mapped_column(default=0)
 
@@ -53,12 +60,14 @@ class PlayerResources(Base):
     player: Mapped["Player"] = relationship("Player", back_populates="resources")
     resource: Mapped["Resource"] = relationship("Resource")
 
+    __table_args__ = (Index('ix_players_resources_player_id_resource_id', 'player_id', 'resource_id'),)
+
 
 class Inventory(Base):
     __tablename__ = 'inventories'
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    player_id: Mapped[int] = mapped_column(ForeignKey('players.id'))
+    player_id: Mapped[int] = mapped_column(ForeignKey('players.id'), index=True)
     item_id: Mapped[int] = mapped_column(ForeignKey('items.id'))
     tier: Mapped[int] = mapped_column(default=1)
     count: Mapped[int] = mapped_column(default=1)
@@ -66,6 +75,40 @@ class Inventory(Base):
     item: Mapped["Item"] = relationship("Item")
 
 
+# Every insert, delete or move of an inventory row updates the owner's used_slots in the same
+# transaction, whichever code path or session touched the row.
+USED_SLOTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION inventories_used_slots() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE players SET used_slots = used_slots - 1 WHERE id = OLD.player_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE players SET used_slots = used_slots + 1 WHERE id = NEW.player_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+USED_SLOTS_TRIGGER = """
+CREATE TRIGGER inventories_used_slots
+AFTER INSERT OR DELETE ON inventories
+FOR EACH ROW EXECUTE FUNCTION inventories_used_slots()
+"""
+
+# Updates that set player_id to the value it already had neither move the slot nor lock the player row.
+USED_SLOTS_MOVE_TRIGGER = """
+CREATE TRIGGER inventories_used_slots_move
+AFTER UPDATE OF player_id ON inventories
+FOR EACH ROW WHEN (OLD.player_id IS DISTINCT FROM NEW.player_id) EXECUTE FUNCTION inventories_used_slots()
+"""
+
+event.listen(Inventory.__table__, "after_create", DDL(USED_SLOTS_FUNCTION))
+event.listen(Inventory.__table__, "after_create", DDL(USED_SLOTS_TRIGGER))
+event.listen(Inventory.__table__, "after_create", DDL(USED_SLOTS_MOVE_TRIGGER))
+
+
 class PlayerBase(Base):
     __tablename__ = 'players_bases'
 
@@ -73,7 +116,7 @@ class PlayerBase(Base):
     defense_level: Mapped[int] = mapped_column(default=1)
     map_object_id: Mapped[int] = mapped_column(ForeignKey('map_objects.id'))
     map_id: Mapped[int] = mapped_column(ForeignKey('maps.id'))
-    owner_id: Mapped[int] = mapped_column(ForeignKey('players.id'))
+    owner_id: Mapped[int] = mapped_column(ForeignKey('players.id'), index=True)
 
     map_object: Mapped["MapObject"] = relationship("MapObject")
     player: Mapped["Player"] = relationship("Player", back_populates="base")
@@ -81,17 +124,31 @@ class PlayerBase(Base):
     items: Mapped[list["PlayerItemStorage"]] = relationship("PlayerItemStorage", uselist=True)
 
 
+# Base ownership is a logged map change, defense upgrades are not.
+PLAYERS_BASES_CHANGE_TRIGGER = """
+CREATE TRIGGER players_bases_change
+AFTER INSERT OR DELETE OR UPDATE OF map_id, map_object_id, owner_id ON players_bases
+FOR EACH ROW EXECUTE FUNCTION map_object_row_change('owner_set')
+"""
+
+event.listen(PlayerBase.__table__, "after_create", DDL(PLAYERS_BASES_CHANGE_TRIGGER))
+
+
 class PlayerResourcesStorage(Base):
     __tablename__ = 'players_resources_storage'
 
     id: Mapped[int] = mapped_column(primary_key=True)
     resource_quantity: Mapped[int] = mapped_column(default=0)
     resource_id: Mapped[int] = mapped_column(ForeignKey('resources.id'))
-    player_base_id: Mapped[int] = mapped_column(ForeignKey('players_bases.id'))
+    player_base_id: Mapped[int] = mapped_column(ForeignKey('players_bases.id'), index=True)
     player_id: Mapped[int] = mapped_column(ForeignKey('players.id'))
 
     resource: Mapped["Resource"] = relationship("Resource")
 
+    __table_args__ = (
+        Index('ix_players_resources_storage_player_id_resource_id', 'player_id', 'resource_id'),
+    )
+
 
 class PlayerItemStorage(Base):
     __tablename__ = 'players_items_storage'
@@ -100,7 +157,7 @@ class PlayerItemStorage(Base):
     tier: Mapped[int] = mapped_column(default=1)
     item_id: Mapped[int] = mapped_column(ForeignKey('items.id'))
     count: Mapped[int] = mapped_column(default=1)
-    player_base_id: Mapped[int] = mapped_column(ForeignKey('players_bases.id'))
+    player_base_id: Mapped[int] = mapped_column(ForeignKey('players_bases.id'), index=True)
     player_id: Mapped[int] = mapped_column(ForeignKey('players.id'))
 
     item: Mapped["Item"] = relationship("Item")
@@ -1,7 +1,10 @@
 from .base import BaseRepository
 from .building import *
+from .catalog import *
 from .farm import *
 from .item import *
 from .map import *
+from .map_index import *
 from .player import *
 from .resource import *
+from .stack_index import *
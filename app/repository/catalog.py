@@ -0,0 +1,134 @@
+import time
+from types import MappingProxyType
+from typing import Iterable, Mapping, NamedTuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models import BuildingCost, Item, PlayerResources, Resource
+
+NO_LIMIT = np.iinfo(np.int64).max
+
+
+class CatalogResource(NamedTuple):
+    id: int
+    name: str
+    icon: str
+
+
+class CatalogCost(NamedTuple):
+    resource_id: int
+    resource_quantity: int
+    resource: CatalogResource
+
+
+class CatalogItem(NamedTuple):
+    id: int
+    name: str
+    icon: str
+    max_count: int
+    type: str
+    can_equip: bool
+    recipe: tuple[CatalogCost, ...]
+
+
+class GameCatalog:
+    """Read-only snapshot of the static game data: resources, items with their recipes and building costs."""
+
+    def __init__(
+            self,
+            version: int,
+            resources: dict[int, CatalogResource],
+            items: dict[int, CatalogItem],
+            building_costs: dict[str, tuple[CatalogCost, ...]],
+    ):
+        self.version = version
+        self.resources: Mapping[int, CatalogResource] = MappingProxyType(resources)
+        self.items: Mapping[int, CatalogItem] = MappingProxyType(items)
+        self.building_costs: Mapping[str, tuple[CatalogCost, ...]] = MappingProxyType(building_costs)
+        self._resource_columns = {resource_id: column for column, resource_id in enumerate(resources)}
+        # Dense items x resources matrix of recipe quantities, rows in the order of self.items.
+        self.recipe_matrix = np.zeros((len(items), len(resources)), dtype=np.int64)
+        for row, item in enumerate(items.values()):
+            for cost in item.recipe:
+                self.recipe_matrix[row, self._resource_columns[cost.resource_id]] += cost.resource_quantity
+        self.recipe_matrix.setflags(write=False)
+
+    def holdings(self, player_resources: Iterable[PlayerResources]) -> np.ndarray:
+        vector = np.zeros(len(self.resources), dtype=np.int64)
+        for resource in player_resources:
+            column = self._resource_columns.get(resource.resource_id)
+            if column is not None:
+                vector[column] += resource.resource_quantity
+        return vector
+
+    def craftable_counts(self, player_resources: Iterable[PlayerResources]) -> np.ndarray:
+        """How many of each item, in the order of self.items, the resources are enough for.
+
+        Items whose recipe needs no resources get NO_LIMIT.
+        """
+        holdings = self.holdings(player_resources)
+        needed = self.recipe_matrix > 0
+        per_resource = np.where(needed, holdings // np.maximum(self.recipe_matrix, 1), NO_LIMIT)
+        return per_resource.min(axis=1, initial=NO_LIMIT)
+
+
+class GameCatalogCache:
+    """Per-process GameCatalog, loaded in the app lifespan or on first use.
+
+    The catalog only changes through migrations and manual edits, so nothing invalidates it
+    automatically: call reload() or invalidate() after changing it.
+    """
+
+    def __init__(self):
+        self._catalog: GameCatalog | None = None
+        self._version = 0
+
+    async def get(self, session: AsyncSession) -> GameCatalog:
+        if self._catalog is None:
+            return await self.reload(session)
+        return self._catalog
+
+    async def reload(self, session: AsyncSession) -> GameCatalog:
+        # Versions are load times in milliseconds, bumped if two loads land in the same millisecond.
+        self._version = max(self._version + 1, time.time_ns() // 1_000_000)
+        self._catalog = await self._load(session, self._version)
+        return self._catalog
+
+    def invalidate(self) -> None:
+        self._catalog = None
+
+    @staticmethod
+    async def _load(session: AsyncSession, version: int) -> GameCatalog:
+        resources = {
+            resource.id: CatalogResource(resource.id, resource.name, resource.icon)
+            for resource in (await session.execute(select(Resource).order_by(Resource.id))).scalars()
+        }
+
+        items = {}
+        stmt = select(Item).order_by(Item.id).options(selectinload(Item.recipe))
+        for item in (await session.execute(stmt)).scalars():
+            recipe = tuple(
+                CatalogCost(cost.resource_id, cost.resource_quantity, resources[cost.resource_id])
+                for cost in sorted(item.recipe, key=lambda cost: cost.id)
+            )
+            items[item.id] = CatalogItem(item.id, item.name, item.icon, item.max_count, item.type, item.can_equip,
+                                         recipe)
+
+        building_costs: dict[str, list[CatalogCost]] = {}
+        for cost in (await session.execute(select(BuildingCost).order_by(BuildingCost.id))).scalars():
+            building_costs.setdefault(cost.type, []).append(
+                CatalogCost(cost.resource_id, cost.resource_quantity, resources[cost.resource_id])
+            )
+
+        return GameCatalog(
+            version,
+            resources,
+            items,
+            {building_type: tuple(costs) for building_type, costs in building_costs.items()},
+        )
+
+
+game_catalog = GameCatalogCache()
@@ -1,5 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.models import FarmSession
 from app.repository import BaseRepository
 
 FarmSessionRepository = BaseRepository[FarmSession]
 farm_session_repository = FarmSessionRepository(FarmSession)
+
+
+async def get_overdue_farm_sessions(session: AsyncSession, before: datetime, limit: int) -> list[tuple[int, datetime]]:
+    stmt = (
+        select(FarmSession.id, FarmSession.end_time)
+        # Inlined rather than bound, so generic plans of the prepared statement still match the partial index.
+        .where(FarmSession.status == literal("in_progress", literal_execute=True), FarmSession.end_time < before)
+        .order_by(FarmSession.end_time)
+        .limit(limit)
+    )
+    return list((await session.execute(stmt)).tuples())
+
+
+async def get_farm_session_end_times(
+        session: AsyncSession, farm_session_ids: list[int]
+) -> list[tuple[int, datetime]]:
+    stmt = select(FarmSession.id, FarmSession.end_time).where(
+        FarmSession.id.in_(farm_session_ids), FarmSession.status == "in_progress"
+    )
+    return list((await session.execute(stmt)).tuples())
@@ -12,14 +12,12 @@ EquipItemRepository = BaseRepository[EquipItem]
 equip_item_repository = EquipItemRepository(EquipItem)
 
 
-async def get_items_for_craft(session: AsyncSession):
-    stmt = select(Item).options(joinedload(Item.recipe).joinedload(ItemRecipe.resource))
-    result = await session.execute(stmt)
-    return result.scalars().unique().all()
-
-
 async def get_item_for_craft(session: AsyncSession, item_id: int):
-    stmt = select(Item).where(Item.id == item_id).options(joinedload(Item.recipe).joinedload(ItemRecipe.resource))
+    stmt = (
+        select(Item)
+        .where(Item.id == item_id)
+        .options(joinedload(Item.recipe).joinedload(ItemRecipe.resource), joinedload(Item.stats))
+    )
     result = await session.execute(stmt)
     return result.unique().scalar_one_or_none()
 
@@ -1,8 +1,9 @@
-from sqlalchemy import and_, not_, or_, select
+from sqlalchemy import and_, func, not_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import contains_eager, joinedload
 
-from app.models.map import Map, MapObject, MapObjectPosition, ResourcesZone
+from app.models.map import Map, MapChange, MapObject, MapObjectPosition, ResourcesZone
+from app.models.player import Player
 from app.repository.base import BaseRepository
 
 MapObjectRepository = BaseRepository[MapObject]
@@ -37,6 +38,68 @@ async def check_placement_on_map(
     map_objects = result.scalar()
     return False if map_objects else True
 
+# Same expression as ix_map_objects_position_box, so && against it can use the GiST index.
+position_box = func.box(
+    func.point(MapObjectPosition.x1, MapObjectPosition.y1), func.point(MapObjectPosition.x2, MapObjectPosition.y2)
+)
+
+
+async def get_map_version(session: AsyncSession, map_id: int) -> int | None:
+    result = await session.execute(select(Map.version).where(Map.id == map_id))
+    return result.scalar_one_or_none()
+
+
+async def get_map_changes(session: AsyncSession, map_id: int, since: int, version: int):
+    stmt = (
+        select(MapChange)
+        .where(MapChange.map_id == map_id, MapChange.version > since, MapChange.version <= version)
+        .order_by(MapChange.version)
+    )
+    result = await session.execute(stmt)
+    return result.scalars().all()
+
+
+async def get_map_objects_in_area(session: AsyncSession, map_id: int, x1: int, y1: int, x2: int, y2: int):
+    stmt = (
+        select(MapObject)
+        .join(MapObject.position)
+        .where(MapObject.map_id == map_id, position_box.op("&&")(func.box(func.point(x1, y1), func.point(x2, y2))))
+        .options(
+            contains_eager(MapObject.position),
+            joinedload(MapObject.resource_zone).joinedload(ResourcesZone.resource),
+        )
+        .order_by(MapObject.id)
+    )
+    result = await session.execute(stmt)
+    return result.unique().scalars().all()
+
+
+async def get_map_objects_by_ids(session: AsyncSession, map_id: int, map_object_ids: list[int]):
+    stmt = (
+        select(MapObject)
+        .where(MapObject.map_id == map_id, MapObject.id.in_(map_object_ids))
+        .options(
+            joinedload(MapObject.position),
+            joinedload(MapObject.resource_zone).joinedload(ResourcesZone.resource),
+        )
+        .order_by(MapObject.id)
+    )
+    result = await session.execute(stmt)
+    return result.unique().scalars().all()
+
+
+async def get_map_occupancy(session: AsyncSession, map_id: int):
+    stmt = (
+        select(MapObject.id.label("map_object_id"), func.count(Player.id).label("players"))
+        .outerjoin(Player, Player.map_object_id == MapObject.id)
+        .where(MapObject.map_id == map_id)
+        .group_by(MapObject.id)
+        .order_by(MapObject.id)
+    )
+    result = await session.execute(stmt)
+    return result.all()
+
+
 async def get_map_objects(session: AsyncSession, map_id: int):
     # map_objects = await map_repository.get(
     #     self.session,
@@ -0,0 +1,94 @@
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.map import Map, MapObject, MapObjectPosition
+
+
+class MapGrid:
+    """Occupancy bitmap of one map, one cell per integer coordinate.
+
+    Rectangles cover x1..x2 and y1..y2 inclusive, like check_placement_on_map, so a map of
+    width x height has (height + 1) x (width + 1) cells.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.occupied = np.zeros((height + 1, width + 1), dtype=bool)
+
+    def add(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        # Positions outside the map can't block anything inside it, so they are clipped.
+        self.occupied[max(y1, 0):max(y2 + 1, 0), max(x1, 0):max(x2 + 1, 0)] = True
+
+    def is_free(self, x1: int, y1: int, x2: int, y2: int) -> bool:
+        return not self.occupied[max(y1, 0):max(y2 + 1, 0), max(x1, 0):max(x2 + 1, 0)].any()
+
+    def nearest_free(self, x: int, y: int, width: int, height: int, limit: int) -> list[tuple[int, int]]:
+        """Top-left corners of the free width x height areas closest to (x, y), nearest first."""
+        rows, cols = self.occupied.shape
+        if height > rows or width > cols:
+            return []
+        # Summed-area table: every window sum comes from four lookups instead of a loop over windows.
+        table = np.zeros((rows + 1, cols + 1), dtype=np.int32)
+        table[1:, 1:] = self.occupied.cumsum(axis=0).cumsum(axis=1)
+        taken = table[height:, width:] - table[:-height, width:] - table[height:, :-width] + table[:-height, :-width]
+        ys, xs = np.nonzero(taken == 0)
+        if not len(xs):
+            return []
+        distance = (xs - x) ** 2 + (ys - y) ** 2
+        if len(distance) > limit:
+            nearest = np.argpartition(distance, limit - 1)[:limit]
+        else:
+            nearest = np.arange(len(distance))
+        nearest = nearest[np.lexsort((xs[nearest], ys[nearest], distance[nearest]))]
+        return [(int(xs[i]), int(ys[i])) for i in nearest]
+
+
+class MapIndexCache:
+    """Per-process MapGrid for every map, built from Postgres on first use.
+
+    Other workers can add objects this process never hears about, so a free answer from here
+    is only a fast path: callers still confirm it with check_placement_on_map and invalidate
+    the map when the two disagree.
+    """
+
+    def __init__(self):
+        self._grids: dict[int, MapGrid] = {}
+
+    async def get(self, session: AsyncSession, map_id: int) -> MapGrid | None:
+        grid = self._grids.get(map_id)
+        if grid is None:
+            grid = await self._build(session, map_id)
+            if grid is not None:
+                self._grids[map_id] = grid
+        return grid
+
+    def add(self, map_id: int, x1: int, y1: int, x2: int, y2: int) -> None:
+        grid = self._grids.get(map_id)
+        if grid is not None:
+            grid.add(x1, y1, x2, y2)
+
+    def invalidate(self, map_id: int | None = None) -> None:
+        if map_id is None:
+            self._grids.clear()
+        else:
+            self._grids.pop(map_id, None)
+
+    @staticmethod
+    async def _build(session: AsyncSession, map_id: int) -> MapGrid | None:
+        map_ = await session.get(Map, map_id)
+        if map_ is None:
+            return None
+        grid = MapGrid(map_.width or 0, map_.height or 0)
+        stmt = (
+            select(MapObjectPosition.x1, MapObjectPosition.y1, MapObjectPosition.x2, MapObjectPosition.y2)
+            .join(MapObject, MapObject.id == MapObjectPosition.map_object_id)
+            .where(MapObject.map_id == map_id)
+        )
+        for x1, y1, x2, y2 in await session.execute(stmt):
+            grid.add(x1, y1, x2, y2)
+        return grid
+
+
+map_index_cache = MapIndexCache()
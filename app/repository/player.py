@@ -1,10 +1,11 @@
-from typing import Sequence
+from functools import lru_cache
+from typing import Iterable
 
-from sqlalchemy import and_, select
+from sqlalchemy import Select, and_, bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload, Mapped
+from sqlalchemy.orm import Load, Mapped, RelationshipProperty, joinedload, selectinload
 
-from app.models import Inventory, Player, PlayerBase, PlayerResources, MapObject, ResourcesZone, EquipItem, Item
+from app.models import Inventory, Player, PlayerBase, PlayerResources
 from app.models.player import PlayerItemStorage, PlayerResourcesStorage, PlayerStats
 from app.repository.base import BaseRepository
 
@@ -26,6 +27,10 @@ player_item_storage_repository = PlayerItemStorageRepository(PlayerItemStorage)
 InventoryRepository = BaseRepository[Inventory]
 inventory_repository = InventoryRepository(Inventory)
 
+PLAYER_ITEMS_PROFILE = frozenset({"stats", "inventory.item.stats", "equip_item.item.stats", "base.items.item.stats"})
+PLAYER_RESOURCES_PROFILE = frozenset({"resources.resource", "base.resources.resource"})
+PLAYER_FULL_PROFILE = PLAYER_ITEMS_PROFILE | PLAYER_RESOURCES_PROFILE
+
 
 def create_new_player(session: AsyncSession, telegram_id: int, name: str, map_id: int):
     player = Player(player_id=telegram_id, name=name, map_id=map_id)
@@ -45,244 +50,49 @@ async def get_all_players(session: AsyncSession, telegram_id: int):
     return result.scalars().unique().all()
 
 
-async def get_player_with_all_items(session: AsyncSession, player_id: int | Mapped[int]):
-    stmt = (
-        select(Player)
-        .where(Player.id == player_id)
-        .options(
-            joinedload(Player.inventory).joinedload(Inventory.item).joinedload(Item.stats),
-            joinedload(Player.base).joinedload(PlayerBase.items).joinedload(PlayerItemStorage.item).joinedload(
-                Item.stats),
-            joinedload(Player.equip_item).joinedload(EquipItem.item).joinedload(Item.stats),
-            joinedload(Player.stats)
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_items(session: AsyncSession, telegram_id: int, map_id: int) -> Player | None:
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.inventory).joinedload(Inventory.item).joinedload(Item.stats),
-            joinedload(Player.base).joinedload(PlayerBase.items).joinedload(PlayerItemStorage.item).joinedload(
-                Item.stats)
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_base_and_resources(session: AsyncSession, telegram_id: int, map_id: int) -> Player | None:
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(joinedload(Player.base), joinedload(Player.resources)
-                 )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_resources_for_craft(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.resources),
-            joinedload(Player.inventory).joinedload(Inventory.item)
+def _build_player_loader(path: str) -> Load:
+    loader = None
+    model = Player
+    for name in path.split("."):
+        attribute = getattr(model, name, None)
+        if attribute is None or not isinstance(getattr(attribute, "property", None), RelationshipProperty):
+            raise ValueError(f"Unknown relationship '{name}' in player loader path '{path}'")
+        # Collections get their own SELECT so sibling collections never multiply each other's rows.
+        strategy = selectinload if attribute.property.uselist else joinedload
+        loader = strategy(attribute) if loader is None else getattr(loader, strategy.__name__)(attribute)
+        model = attribute.property.mapper.class_
+    return loader
+
+
+@lru_cache(maxsize=None)
+def _build_player_statement(by_id: bool, include: frozenset[str]) -> Select:
+    if by_id:
+        stmt = select(Player).where(Player.id == bindparam("player_id"))
+    else:
+        stmt = select(Player).where(
+            and_(Player.player_id == bindparam("telegram_id"), Player.map_id == bindparam("map_id"))
         )
-    )
-    result = await session.execute(stmt)
+    loaders = [_build_player_loader(path) for path in sorted(include)]
+    return stmt.options(*loaders) if loaders else stmt
+
+
+async def load_player(
+        session: AsyncSession,
+        telegram_id: int | None = None,
+        map_id: int | None = None,
+        player_id: int | Mapped[int] | None = None,
+        include: Iterable[str] = (),
+) -> Player | None:
+    """Load a player by (telegram_id, map_id) or by player_id with the relationship paths in include.
+
+    Paths are dotted relationship names starting at Player, e.g. "inventory.item.stats".
+    """
+    if player_id is not None:
+        stmt = _build_player_statement(True, frozenset(include))
+        params = {"player_id": player_id}
+    else:
+        stmt = _build_player_statement(False, frozenset(include))
+        params = {"telegram_id": telegram_id, "map_id": map_id}
+    result = await session.execute(stmt, params)
     return result.unique().scalar_one_or_none()
 
-
-async def get_player_with_resources_for_transfer(
-        session: AsyncSession, telegram_id: int, map_id: int, resource_id: int
-) -> Player:
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.resources.and_(PlayerResources.resource_id == resource_id))
-            .joinedload(PlayerResources.resource),
-            joinedload(Player.base)
-            .joinedload(PlayerBase.resources.and_(PlayerResourcesStorage.resource_id == resource_id))
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_all_resources(session: AsyncSession, telegram_id: int, map_id: int) -> Player:
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.resources).joinedload(PlayerResources.resource),
-            joinedload(Player.base).joinedload(PlayerBase.resources)
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_inventory(session: AsyncSession, player_id: int) -> Sequence[Inventory]:
-    stmt = (
-        select(Inventory)
-        .where(Inventory.player_id == player_id)
-        .options(joinedload(Inventory.item).joinedload(Item.stats)))
-    result = await session.execute(stmt)
-    return result.scalars().all()
-
-
-async def get_player_with_equip_items(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(joinedload(Player.equip_item).joinedload(EquipItem.item))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def create_player_inventory(session: AsyncSession, player_id: int, item_id: int) -> Inventory:
-    player_inventory = Inventory(player_id=player_id, item_id=item_id)
-    session.add(player_inventory)
-    return player_inventory
-
-
-async def get_player_with_resources_and_items(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.resources).joinedload(PlayerResources.resource),
-            joinedload(Player.stats),
-            joinedload(Player.equip_item).joinedload(EquipItem.item).joinedload(Item.stats),
-            joinedload(Player.base).joinedload(PlayerBase.resources),
-            joinedload(Player.base).joinedload(PlayerBase.items).joinedload(PlayerItemStorage.item).joinedload(
-                Item.stats),
-            joinedload(Player.inventory).joinedload(Inventory.item).joinedload(Item.stats)
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_base(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(joinedload(Player.base))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_resources(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(joinedload(Player.resources).joinedload(PlayerResources.resource))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_resources_and_zone_resources(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.map_object).joinedload(MapObject.resource_zone).joinedload(ResourcesZone.resource),
-            joinedload(Player.resources)
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_specific_resource(session: AsyncSession, player_id: int, resource_id: int):
-    stmt = (
-        select(Player)
-        .where(Player.id == player_id)
-        .options(joinedload(Player.resources.and_(PlayerResources.resource_id == resource_id)))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_resource_quantity(session: AsyncSession, player_id: int, resource_id: int):
-    stmt = (select(PlayerResources.resource_quantity)
-            .where(and_(PlayerResources.player_id == player_id, PlayerResources.resource_id == resource_id)
-                   )
-            )
-    result = await session.execute(stmt)
-    return result.scalar_one_or_none()
-
-
-async def get_player_with_specific_item(session: AsyncSession, telegram_id: int, map_id: int, item_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.inventory.and_(Inventory.id == item_id)).joinedload(Inventory.item),
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_specific_player_equip_items(session: AsyncSession, player_id: int, item_type: str):
-    stmt = (
-        select(Player).where(Player.id == player_id)
-        .options(joinedload(Player.equip_item).joinedload(EquipItem.item.and_(Item.type == item_type)))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_inventory_item_with_stats(session: AsyncSession, player_id: int, item_id: int):
-    stmt = (
-        select(Inventory)
-        .where(and_(Inventory.player_id == player_id, Inventory.id == item_id))
-        .options(joinedload(Inventory.item).joinedload(Item.stats))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_equip_item_with_specific_type(session: AsyncSession, player_id: int, item_type: str):
-    stmt = (
-        select(EquipItem)
-        .where(and_(EquipItem.player_id == player_id))
-        .options(joinedload(EquipItem.item.and_(Item.type == item_type)).joinedload(Item.stats))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_stats(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(joinedload(Player.stats))
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
-
-
-async def get_player_with_inventory_items(session: AsyncSession, telegram_id: int, map_id: int):
-    stmt = (
-        select(Player)
-        .where(and_(Player.player_id == telegram_id, Player.map_id == map_id))
-        .options(
-            joinedload(Player.stats),
-            joinedload(Player.inventory).joinedload(Inventory.item).joinedload(Item.stats),
-        )
-    )
-    result = await session.execute(stmt)
-    return result.unique().scalar_one_or_none()
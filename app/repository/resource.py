@@ -1,4 +1,9 @@
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import Integer, column, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.models import PlayerResources, PlayerResourcesStorage, Resource
 from app.repository import BaseRepository
@@ -13,7 +18,7 @@ def create_storage_resource(
         count: int,
         player_base_id: int,
         player_id: int
-) -> None:
+) -> PlayerResourcesStorage:
     storage_resource = PlayerResourcesStorage(
         player_base_id=player_base_id,
         resource_id=resource_id,
@@ -21,12 +26,55 @@ def create_storage_resource(
         resource_quantity=count
     )
     session.add(storage_resource)
+    return storage_resource
 
 
-def create_inventory_resource(session: AsyncSession, resource_id: int, count: int, player_id: int) -> None:
+def create_inventory_resource(session: AsyncSession, resource_id: int, count: int, player_id: int) -> PlayerResources:
     inventory_resource = PlayerResources(
         resource_id=resource_id,
         player_id=player_id,
         resource_quantity=count
     )
     session.add(inventory_resource)
+    return inventory_resource
+
+
+async def apply_resource_deltas(
+        session: AsyncSession,
+        model: type[PlayerResources] | type[PlayerResourcesStorage],
+        deltas: Iterable[tuple[int, int, int]],
+) -> dict[tuple[int, int], int]:
+    """Apply (player_id, resource_id, delta) changes in one UPDATE guarded by quantity + delta >= 0.
+
+    Returns the new quantity per (player_id, resource_id) for the rows that were updated; rows that
+    are missing or would go negative are left untouched and absent from the result.
+    """
+    merged: dict[tuple[int, int], int] = defaultdict(int)
+    for player_id, resource_id, delta in deltas:
+        merged[(player_id, resource_id)] += delta
+    if not merged:
+        return {}
+
+    delta_values = values(
+        column("player_id", Integer), column("resource_id", Integer), column("delta", Integer), name="deltas"
+    ).data([(player_id, resource_id, delta) for (player_id, resource_id), delta in merged.items()])
+    stmt = (
+        update(model)
+        .where(
+            model.player_id == delta_values.c.player_id,
+            model.resource_id == delta_values.c.resource_id,
+            model.resource_quantity + delta_values.c.delta >= 0,
+        )
+        .values(resource_quantity=model.resource_quantity + delta_values.c.delta)
+        .returning(model.id, model.player_id, model.resource_id, model.resource_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.execute(stmt)
+
+    updated = {}
+    for row in result.all():
+        updated[(row.player_id, row.resource_id)] = row.resource_quantity
+        loaded = session.identity_map.get(session.identity_key(model, row.id))
+        if loaded is not None:
+            set_committed_value(loaded, "resource_quantity", row.resource_quantity)
+    return updated
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from typing import Iterable
+
+from app.models import EquipItem, Inventory, PlayerItemStorage
+
+Stack = Inventory | PlayerItemStorage | EquipItem
+
+
+class StackIndex:
+    """Stacks of one loaded container that still have room, keyed by (item_id, tier), and its free slots.
+
+    It is built once from the loaded stacks (each with its item) and the container's free slots, and
+    whoever changes the container keeps it current with add(), remove() and update(). free_slots is
+    None for containers without a slot limit.
+    """
+
+    def __init__(self, stacks: Iterable[Stack], free_slots: int | None = None):
+        self.free_slots = free_slots
+        # Dicts used as ordered sets, so stacks are filled in the order they were loaded.
+        self._with_room: dict[tuple[int, int], dict[Stack, None]] = defaultdict(dict)
+        for stack in stacks:
+            self.update(stack)
+
+    def add(self, stack: Stack) -> None:
+        if self.free_slots is not None:
+            self.free_slots -= 1
+        self.update(stack)
+
+    def remove(self, stack: Stack) -> None:
+        if self.free_slots is not None:
+            self.free_slots += 1
+        self._with_room[(stack.item_id, stack.tier)].pop(stack, None)
+
+    def update(self, stack: Stack) -> None:
+        """Call after changing stack.count."""
+        stacks = self._with_room[(stack.item_id, stack.tier)]
+        if stack.count < stack.item.max_count:
+            stacks[stack] = None
+        else:
+            stacks.pop(stack, None)
+
+    def with_room(self, item_id: int, tier: int) -> Stack | None:
+        return next(iter(self._with_room.get((item_id, tier), ())), None)
+
+    def capacity(self, item_id: int, tier: int, max_count: int) -> int | None:
+        """How many more of the item fit: room in its stacks plus full stacks in free slots, None if unlimited."""
+        if self.free_slots is None:
+            return None
+        room = sum(max_count - stack.count for stack in self._with_room.get((item_id, tier), ()))
+        return room + max(self.free_slots, 0) * max_count
@@ -4,3 +4,8 @@ from enum import Enum
 class TransferDirection(Enum):
     TO_STORAGE = "to_storage"
     FROM_STORAGE = "from_storage"
+
+
+class TransferKind(Enum):
+    ITEM = "item"
+    RESOURCE = "resource"
@@ -18,3 +18,8 @@ class BuildingCostSchema(BaseModel):
 class BuildingCostResponseSchema(BaseModel):
     resources: list[BuildingCostSchema]
     can_build: bool
+
+
+class FreePlacementSchema(BaseModel):
+    x1: int
+    y1: int
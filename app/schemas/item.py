@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.schemas.base import TransferDirection
 from app.schemas.resource import ResourceCountSchema
@@ -38,6 +38,7 @@ class ItemSchemaResponse(ItemSchema):
 class CraftItemSchema(BaseModel):
     map_id: int
     item_id: int
+    count: int = Field(default=1, ge=1)
 
 
 class RecipeSchema(BaseModel):
@@ -48,6 +49,7 @@ class ItemResponseSchema(BaseModel):
     id: int
     name: str
     can_craft: bool
+    max_craft_count: Optional[int] = None
     icon: str
     recipe: RecipeSchema
 
@@ -15,6 +15,15 @@ class ObjectType(Enum):
     BASE = "base"
 
 
+class MapChangeType(Enum):
+    CREATED = "object_created"
+    UPDATED = "object_updated"
+    DELETED = "object_deleted"
+    POSITION = "position_set"
+    ZONE = "zone_set"
+    OWNER = "owner_set"
+
+
 class Resources(Enum):
     WOOD = "wood"
     STONE = "stone"
@@ -61,6 +70,29 @@ class MapObjectResponseSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MapTileSchema(BaseModel):
+    map_id: int
+    x: int
+    y: int
+    size: int
+    map_objects: list[MapObjectResponseSchema]
+
+
+class MapObjectChangeSchema(BaseModel):
+    version: int
+    type: MapChangeType
+    map_object_id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MapObjectOccupancySchema(BaseModel):
+    map_object_id: int
+    players: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class BaseMapSchema(BaseModel):
     id: int
     height: int
@@ -73,3 +105,10 @@ class MapResponseSchema(BaseMapSchema):
     map_objects: Optional[list[MapObjectResponseSchema]] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class MapChangesSchema(BaseModel):
+    version: int
+    changes: list[MapObjectChangeSchema] = []
+    map_objects: list[MapObjectResponseSchema] = []
+    snapshot: Optional[MapResponseSchema] = None
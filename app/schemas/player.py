@@ -4,6 +4,7 @@ from typing import Optional
 from pydantic import BaseModel, ConfigDict, Field
 from sqlalchemy.orm import Mapped
 
+from app.schemas.base import TransferDirection, TransferKind
 from app.schemas.farm import FarmSessionSchema
 from app.schemas.item import ItemSchemaResponse, ItemSchema
 from app.schemas.resource import ResourceCountSchema
@@ -79,6 +80,24 @@ class PlayerItemsSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TransferLineSchema(BaseModel):
+    kind: TransferKind
+    # Inventory or storage stack id for items, resource id for resources.
+    id: int
+    count: int = Field(ge=1)
+    direction: TransferDirection
+
+
+class BulkTransferSchema(BaseModel):
+    map_id: int
+    lines: list[TransferLineSchema] = Field(min_length=1, max_length=100)
+
+
+class BulkTransferResponseSchema(BaseModel):
+    items: PlayerItemsSchema
+    resources: PlayerResourcesSchema
+
+
 class PlayerEquipItemResponseSchema(BaseModel):
     stats: PlayerStatsSchema
     items: Optional[PlayerItemsSchema] = None
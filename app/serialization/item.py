@@ -1,17 +1,20 @@
 from typing import Optional, Sequence
 
-from app.models import Item, Player
+from app.models import Player
+from app.repository.catalog import NO_LIMIT, GameCatalog
 from app.schemas import (ItemResponseSchema, ItemSchema, PlayerItemsSchema, RecipeSchema, ResourceCountSchema,
                          )
-from app.validation.player import does_player_have_enough_resources
 
 
-def serialize_item_recipe(items: Sequence[Item], player: Player) -> list[ItemResponseSchema]:
+def serialize_item_recipe(catalog: GameCatalog, player: Player) -> list[ItemResponseSchema]:
+    # Like does_player_have_enough_resources, a player without any resources can't craft anything.
+    counts = catalog.craftable_counts(player.resources).tolist() if player.resources else [0] * len(catalog.items)
     response = [
         ItemResponseSchema(
             id=item.id,
             name=item.name,
-            can_craft=does_player_have_enough_resources(item.recipe, player.resources),
+            can_craft=count > 0,
+            max_craft_count=None if count == NO_LIMIT else count,
             icon=item.icon,
             recipe=RecipeSchema(
                 resources=[
@@ -24,7 +27,7 @@ def serialize_item_recipe(items: Sequence[Item], player: Player) -> list[ItemRes
                 ]
             ),
         )
-        for item in items
+        for item, count in zip(catalog.items.values(), counts)
     ]
 
     return response
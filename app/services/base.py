@@ -5,6 +5,9 @@ from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models import PlayerResources, PlayerResourcesStorage
+from app.repository import apply_resource_deltas
+
 ModelType = TypeVar("ModelType")
 
 
@@ -20,6 +23,16 @@ class BaseService:
             await session.rollback()
             raise HTTPException(status_code=500, detail=str(e.orig))
 
+    @staticmethod
+    async def update_resources(
+            session: AsyncSession,
+            deltas: list[tuple[int, int, int]],
+            model: type[PlayerResources] | type[PlayerResourcesStorage] = PlayerResources,
+    ) -> None:
+        updated = await apply_resource_deltas(session, model, deltas)
+        if len(updated) != len({(player_id, resource_id) for player_id, resource_id, _ in deltas}):
+            raise HTTPException(status_code=400, detail="Not enough resources")
+
 
 class BaseTransferService(ABC):
     def __init__(self, session: AsyncSession):
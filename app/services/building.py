@@ -2,19 +2,20 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped
 
+from app.core.config import BASE_SIZE
 from app.models import MapObject, PlayerBase
-from app.repository import building_cost_repository, get_building_cost
-from app.repository.player import (get_player_with_base_and_resources,
-                                   get_player_with_resources,
-                                   player_base_repository)
-from app.schemas.building import BuildingCostResponseSchema, BuildingCostSchema
+from app.repository import game_catalog
+from app.repository.map import map_object_position_repository
+from app.repository.map_index import map_index_cache
+from app.repository.player import load_player, player_base_repository
+from app.schemas.building import BuildingCostResponseSchema, BuildingCostSchema, FreePlacementSchema
 from app.schemas.player import (PlayerBaseCreateDBSchema,
                                 PlayerBaseCreateSchema, PlayerBaseSchema)
 from app.serialization.resource import serialize_resources
 from app.services.base import BaseService
 from app.services.map import MapObjectService, MapService
-from app.services.player import PlayerService
 from app.validation.building import validate_before_building
+from app.validation.map import validate_map
 from app.validation.player import (does_player_have_enough_resources,
                                    validate_player)
 
@@ -26,8 +27,10 @@ class BuildingService:
         self.map_object_service = MapObjectService(session)
 
     async def create_base(self, telegram_id: int, object_data: PlayerBaseCreateSchema, ) -> PlayerBaseSchema:
-        player = await get_player_with_base_and_resources(self.session, telegram_id, object_data.map_id)
-        building_costs = await building_cost_repository.get_multi(self.session, type="base")
+        player = await load_player(
+            self.session, telegram_id, object_data.map_id, include={"base", "resources.resource"}
+        )
+        building_costs = (await game_catalog.get(self.session)).building_costs.get("base", ())
 
         await validate_before_building(
             self.session, building_costs, player, object_data.x1, object_data.y1, object_data.map_id  # type: ignore
@@ -36,10 +39,16 @@ class BuildingService:
         new_map_object = await self._add_object_on_map(object_data, player.name)
         new_map_object_id = new_map_object.id
         await self._create_player_base(player.id, new_map_object)  # type: ignore
-        self._update_resources_after_building(building_costs, player.resources)  # type: ignore
+        await self._update_resources_after_building(building_costs, player.id)  # type: ignore
 
         await BaseService.commit_or_rollback(self.session)
-        player = await get_player_with_resources(self.session, telegram_id, object_data.map_id)
+        map_index_cache.add(
+            object_data.map_id,
+            object_data.x1,
+            object_data.y1,
+            object_data.x1 + BASE_SIZE - 1,
+            object_data.y1 + BASE_SIZE - 1,
+        )
         resources = serialize_resources(player.resources)
         return PlayerBaseSchema(
             map_object_id=new_map_object_id,
@@ -57,11 +66,10 @@ class BuildingService:
         )
         return new_player_base
 
-    def _update_resources_after_building(self, building_costs, player_resources) -> None:
-        for cost in building_costs:
-            PlayerService.update_resources(
-                player_resources, cost.resource_id, cost.resource_quantity, "decrease"
-            )
+    async def _update_resources_after_building(self, building_costs, player_id: int | Mapped[int]) -> None:
+        await BaseService.update_resources(
+            self.session, [(player_id, cost.resource_id, -cost.resource_quantity) for cost in building_costs]
+        )
 
     async def _add_object_on_map(self, object_data: PlayerBaseCreateSchema,
                                  player_name: str | Mapped[str]) -> MapObject:
@@ -69,18 +77,32 @@ class BuildingService:
         await MapObjectService(self.session).add_position(
             object_data.x1,
             object_data.y1,
-            object_data.x1 + 1,
-            object_data.y1 + 1,
-            new_map_object.id
+            object_data.x1 + BASE_SIZE - 1,
+            object_data.y1 + BASE_SIZE - 1,
+            new_map_object
         )
         return new_map_object
 
     async def get_cost(self, building_type: str, telegram_id: int, map_id: int) -> BuildingCostResponseSchema:
-        costs = await get_building_cost(self.session, building_type)
+        costs = (await game_catalog.get(self.session)).building_costs.get(building_type)
         if not costs:
             raise HTTPException(status_code=404, detail="Building cost not found")
-        player = await get_player_with_resources(self.session, telegram_id, map_id)
+        player = await load_player(self.session, telegram_id, map_id, include={"resources"})
         validate_player(player)
         can_build = does_player_have_enough_resources(costs, player.resources)
         resources = [BuildingCostSchema.model_validate(model) for model in costs]
         return BuildingCostResponseSchema(can_build=can_build, resources=resources)
+
+    async def suggest_placements(
+            self, telegram_id: int, map_id: int, x: int | None, y: int | None, limit: int
+    ) -> list[FreePlacementSchema]:
+        if x is None or y is None:
+            player = await load_player(self.session, telegram_id, map_id)
+            validate_player(player)
+            position = await map_object_position_repository.get(self.session, map_object_id=player.map_object_id)
+            x, y = ((position.x1 + position.x2) // 2, (position.y1 + position.y2) // 2) if position else (0, 0)
+        grid = await map_index_cache.get(self.session, map_id)
+        validate_map(grid)
+        # Advisory only: POST /bases/ still checks the spot against the database.
+        placements = grid.nearest_free(x, y, BASE_SIZE, BASE_SIZE, limit)
+        return [FreePlacementSchema(x1=x1, y1=y1) for x1, y1 in placements]
@@ -1,31 +1,36 @@
-import asyncio
-import json
 from datetime import datetime, timedelta
 
 from fastapi import status
-from sqlalchemy import select
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import redis_client
-from app.models import (Resource, PlayerResources)
-from app.repository import farm_session_repository, player_repository, get_player_with_resources_and_zone_resources, \
-    get_player_resource_quantity, get_player_with_specific_resource
+from app.core.config import FARM_TASK_STREAM, FARM_TASK_STREAM_MAXLEN
+from app.models import FarmSession, Player, PlayerResources
+from app.repository import (apply_resource_deltas, create_inventory_resource, farm_session_repository,
+                            game_catalog, load_player, repository_resource)
 from app.schemas import (FarmSessionCreateSchema, FarmSessionSchema,
                          StartFarmResourcesSchema, StopFarmResourcesSchema)
 from app.services.base import BaseService
+from app.services.regeneration import regenerate, set_player_status
+from app.services.resource import ResourceService
 from app.validation.farm import validate_farm_session
 from app.validation.player import validate_player_before_farming, validate_player
 
 
 class FarmingService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, redis: Redis | None = None):
         self.session = session
+        # Only needed to publish farm tasks; settling and stopping never touch Redis.
+        self.redis = redis
 
     async def start_farming(self, farm_data: StartFarmResourcesSchema, telegram_id: int) -> FarmSessionSchema:
-        player = await get_player_with_resources_and_zone_resources(self.session, telegram_id, farm_data.map_id)
+        player = await load_player(
+            self.session, telegram_id, farm_data.map_id, include={"map_object.resource_zone.resource"}
+        )
+        validate_player(player)
+        regenerate(player)
         validate_player_before_farming(player, farm_data.total_minutes)
-        player_id = player.id
-        player.status = "farming"
+        set_player_status(player, "farming")
 
         farm_session = await farm_session_repository.create(
             self.session,
@@ -39,80 +44,91 @@ class FarmingService:
         )
 
         farm_session_id = farm_session.id
-        resource_id = farm_session.resource_id
+        end_time = farm_session.end_time
         total_seconds = int((farm_session.end_time - farm_session.start_time).total_seconds())
         seconds_pass = int((datetime.now() - farm_session.start_time).total_seconds())
 
         await BaseService.commit_or_rollback(self.session)
 
-        player_resource_quantity = await get_player_resource_quantity(self.session, player_id, resource_id)
-
-        await self._publish_farm_task(
-            farm_data.total_minutes,
-            player_resource_quantity,
-            farm_session_id,
-            resource_id,
-            player_id,
-        )
+        await self._publish_farm_task(farm_session_id, end_time)
 
         return FarmSessionSchema(total_seconds=total_seconds, seconds_pass=seconds_pass)
 
     @staticmethod
-    async def update_player_resources_while_farming(
-            session: AsyncSession,
-            resource_id: int,
-            player_id: int,
-            minute: int,
-            multiplier: int
-    ):
-        player = await get_player_with_specific_resource(session, player_id, resource_id)
-        if player.status != "farming":
-            raise ValueError("Player is not farming")
-        base_gain = 1
-        if minute % 5 == 0:
-            multiplier += 1
-        if not player.resources:
-            player_resource = PlayerResources(
-                player_id=player.id, resource_id=resource_id, resource_quantity=base_gain * multiplier
+    def get_farmed_minutes(farm_session: FarmSession, now: datetime) -> int:
+        farmed_until = min(now, farm_session.end_time)
+        return max(0, int((farmed_until - farm_session.start_time).total_seconds()) // 60)
+
+    async def settle_farm_session(
+            self, player: Player, farm_session: FarmSession, now: datetime | None = None
+    ) -> bool:
+        """Credit everything farmed since the last settlement; player.resources must be loaded.
+
+        The session row is locked and reloaded first, so concurrent settlers (GET /players, stop farming,
+        the broker) wait for each other and only the first one credits a given minute. The player and its
+        resources are reloaded under that lock too, as an earlier settler may have changed them since
+        they were loaded.
+        """
+        now = now or datetime.now()
+        await self.session.refresh(farm_session, with_for_update=True)
+        if farm_session.status != "in_progress":
+            return False
+        await self.session.refresh(player, ["energy", "status", "resources"], with_for_update=True)
+        farmed_minutes = self.get_farmed_minutes(farm_session, now)
+        new_minutes = farmed_minutes - farm_session.settled_minutes
+        if new_minutes > 0:
+            gained = (
+                    ResourceService.get_resource_count_after_farming(
+                        farmed_minutes, farm_session.base_gain, farm_session.multiplier_interval
+                    )
+                    - ResourceService.get_resource_count_after_farming(
+                        farm_session.settled_minutes, farm_session.base_gain, farm_session.multiplier_interval
+                    )
             )
-            session.add(player_resource)
+            await self._add_farmed_resource(player, farm_session.resource_id, gained)
+            player.energy = max(0, player.energy - new_minutes)
+            farm_session.settled_minutes = farmed_minutes
+        if now >= farm_session.end_time:
+            self._complete_farm_session(player, farm_session)
+        return new_minutes > 0 or farm_session.status == "completed"
+
+    async def _add_farmed_resource(self, player: Player, resource_id: int, count: int) -> None:
+        # The delta is applied atomically but adds up across callers: only call this for minutes claimed
+        # under the row lock in settle_farm_session, after player.resources was reloaded there.
+        player_resource = next((res for res in player.resources if res.resource_id == resource_id), None)
+        if player_resource:
+            await apply_resource_deltas(self.session, PlayerResources, [(player.id, resource_id, count)])
         else:
-            player.resources[0].resource_quantity += base_gain * multiplier
-        player.energy -= 1
-        await asyncio.sleep(60)
-        await BaseService.commit_or_rollback(session)
+            player_resource = create_inventory_resource(self.session, resource_id, count, player.id)
+            player_resource.resource = await repository_resource.get_by_id(self.session, resource_id)
+            player.resources.append(player_resource)
+
+    @staticmethod
+    def _complete_farm_session(player: Player, farm_session: FarmSession) -> None:
+        farm_session.status = "completed"
+        if player.status == "farming":
+            set_player_status(player, "waiting")
 
     async def stop_farming(self, telegram_id: int, farm_data: StopFarmResourcesSchema):
-        player = await player_repository.get(
-            self.session, player_id=telegram_id, map_id=farm_data.map_id, status="farming"
-        )
+        player = await load_player(self.session, telegram_id, farm_data.map_id, include={"resources"})
+        if player and player.status != "farming":
+            player = None
         validate_player(player)
         farm_session = await farm_session_repository.get(
             self.session, player_id=player.id, status="in_progress", map_id=farm_data.map_id
         )
         validate_farm_session(farm_session)
-        player.status = "waiting"
-        farm_session.status = "completed"
+        await self.settle_farm_session(player, farm_session)
+        self._complete_farm_session(player, farm_session)
         await BaseService.commit_or_rollback(self.session)
         return status.HTTP_204_NO_CONTENT
 
-    async def _publish_farm_task(
-            self,
-            total_minutes: int,
-            resource_count: int,
-            farm_session_id: int,
-            resource_id: int,
-            player_id: int,
-    ) -> None:
+    async def _publish_farm_task(self, farm_session_id: int, end_time: datetime) -> None:
         task_data = {
-            "total_minutes": total_minutes,
             "farm_session_id": farm_session_id,
-            "resource_id": resource_id,
-            "player_id": player_id,
-            "resources_before_farming": resource_count if resource_count else 0
+            "end_time": end_time.isoformat(),
         }
-        redis_client.rpush('task_queue', json.dumps(task_data))
+        await self.redis.xadd(FARM_TASK_STREAM, task_data, maxlen=FARM_TASK_STREAM_MAXLEN, approximate=True)
 
     async def get_resources(self):
-        result = await self.session.execute(select(Resource).order_by(Resource.id))
-        return result.scalars().all()
+        return list((await game_catalog.get(self.session)).resources.values())
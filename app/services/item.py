@@ -4,22 +4,16 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Inventory, Item, Player, PlayerItemStorage, EquipItem, ItemStat
-from app.repository import (create_inventory_item, create_player_inventory,
-                            create_storage_item, get_player_inventory,
-                            get_item_for_craft, get_items_for_craft,
-                            get_player_with_items,
-                            get_player_with_resources_for_craft,
-                            inventory_repository,
-                            player_item_storage_repository, get_inventory_item_with_stats, get_player_with_stats,
-                            get_equip_item_with_specific_type, create_equip_item,
-                            get_player_with_all_items, equip_item_repository, get_player_with_inventory_items)
+from app.repository import (PLAYER_ITEMS_PROFILE, create_inventory_item,
+                            create_storage_item, game_catalog, get_item_for_craft,
+                            inventory_repository, load_player,
+                            player_item_storage_repository, create_equip_item, StackIndex)
 from app.schemas import (CraftItemSchema, EquipItemSchema, ItemLocation,
                          ItemResponseSchema, PlayerItemsSchema, TransferItemSchema, PlayerEquipItemResponseSchema,
                          ItemSchema)
 from app.serialization.item import (serialize_items, serialize_item_recipe,
                                     serialize_player_items)
 from app.services.base import BaseService, BaseTransferService
-from app.services.player import PlayerService
 from app.validation.item import (validate_item_before_delete,
                                  validate_item_before_transfer)
 from app.validation.player import (can_player_craft_item,
@@ -30,30 +24,63 @@ from app.validation.player import (can_player_craft_item,
 class ItemContainer(ABC):
     def __init__(self, player: Player) -> None:
         self.player = player
+        self._stacks: StackIndex | None = None
 
     @abstractmethod
     def get_item(self) -> list:
         pass
 
+    def get_free_slots(self) -> int | None:
+        return None
+
+    @property
+    def stacks(self) -> StackIndex:
+        # Built on first use and then kept current by the methods below for the rest of the request.
+        if self._stacks is None:
+            self._stacks = StackIndex(self.get_item(), self.get_free_slots())
+        return self._stacks
+
     @abstractmethod
     async def create_item(self, session: AsyncSession, item: PlayerItemStorage | Inventory, count: int) -> None:
         pass
 
+    def add_item(self, item: PlayerItemStorage | Inventory) -> None:
+        self.get_item().append(item)
+        if self._stacks is not None:
+            self._stacks.add(item)
+
+    def item_changed(self, item: PlayerItemStorage | Inventory) -> None:
+        if self._stacks is not None:
+            self._stacks.update(item)
+
+    async def delete_item(self, session: AsyncSession, item: PlayerItemStorage | Inventory) -> None:
+        self.get_item().remove(item)
+        if self._stacks is not None:
+            self._stacks.remove(item)
+        await session.delete(item)
+
 
 class StorageContainer(ItemContainer):
     def get_item(self) -> list:
         return self.player.base.items
 
-    async def create_item(self, session: AsyncSession, item: PlayerItemStorage, count: int) -> None:
-        create_storage_item(session, item.item_id, count, self.player.base.id, self.player.id, item.tier)
+    async def create_item(self, session: AsyncSession, item: Inventory, count: int) -> None:
+        new_item = create_storage_item(session, item.item_id, count, self.player.base.id, self.player.id, item.tier)
+        new_item.item = item.item
+        self.add_item(new_item)
 
 
 class InventoryContainer(ItemContainer):
     def get_item(self) -> list:
         return self.player.inventory
 
-    async def create_item(self, session: AsyncSession, item: Inventory, count: int) -> None:
-        create_inventory_item(session, item.item_id, self.player.id, count, item.tier)
+    def get_free_slots(self) -> int | None:
+        return self.player.inventory_slots - self.player.used_slots
+
+    async def create_item(self, session: AsyncSession, item: PlayerItemStorage, count: int) -> None:
+        new_item = create_inventory_item(session, item.item_id, self.player.id, tier=item.tier, count=count)
+        new_item.item = item.item
+        self.add_item(new_item)
 
 
 class ItemService:
@@ -61,9 +88,9 @@ class ItemService:
         self.session = session
 
     async def get_items(self, map_id: int, telegram_id: int) -> list[ItemResponseSchema]:
-        player = await get_player_with_resources_for_craft(self.session, telegram_id, map_id)
-        items = await get_items_for_craft(self.session)
-        response = serialize_item_recipe(items, player)
+        player = await load_player(self.session, telegram_id, map_id, include={"resources"})
+        catalog = await game_catalog.get(self.session)
+        response = serialize_item_recipe(catalog, player)
         return response
 
     async def delete(
@@ -74,73 +101,72 @@ class ItemService:
             count: int,
             item_location: ItemLocation
     ) -> PlayerItemsSchema:
-        player = await get_player_with_items(self.session, telegram_id, map_id)
+        player = await load_player(self.session, telegram_id, map_id, include=PLAYER_ITEMS_PROFILE)
         validate_player(player)
-        player_id = player.id
         if item_location.value == "inventory":
-            repository = inventory_repository
+            container: ItemContainer = InventoryContainer(player)
         elif item_location.value == "storage":
-            repository = player_item_storage_repository
+            container = StorageContainer(player)
         else:
             raise HTTPException(status_code=404, detail="Direction not found")
-        item = await repository.get(self.session, id=item_id, player_id=player.id)
+        item = next((item for item in container.get_item() if item.id == item_id), None)
         validate_item_before_delete(item, count)
 
-        await self.update_item_after_delete(item, count)
+        await self.update_item_after_delete(container, item, count)
         await BaseService.commit_or_rollback(self.session)
-        player = await get_player_with_all_items(self.session, player_id)
         return serialize_player_items(player)
 
-    async def update_item_after_delete(self, item: Inventory, count: int) -> None:
+    async def update_item_after_delete(self, container: ItemContainer, item: Inventory, count: int) -> None:
         if item.count == count:
-            await self.session.delete(item)
+            await container.delete_item(self.session, item)
         else:
             item.count -= count
 
     async def craft(self, telegram_id: int, craft_data: CraftItemSchema) -> list[ItemSchema]:
-        player = await get_player_with_resources_for_craft(
+        player = await load_player(
             self.session,
             telegram_id,
-            craft_data.map_id
+            craft_data.map_id,
+            include={"resources", "inventory.item.stats"}
         )
+        validate_player(player)
         item = await get_item_for_craft(self.session, craft_data.item_id)
-        can_player_craft_item(player, item)
-        player_id = player.id
-        for recipe in item.recipe:
-            PlayerService.update_resources(
-                player.resources, recipe.resource_id, recipe.resource_quantity, "decrease"
-            )
+        inventory = InventoryContainer(player)
+        can_player_craft_item(player, item, craft_data.count, inventory.stacks)
+        await BaseService.update_resources(
+            self.session,
+            [(player.id, recipe.resource_id, -recipe.resource_quantity * craft_data.count) for recipe in item.recipe]
+        )
 
-        await self._update_inventory_items_after_craft(player, item)
+        self._update_inventory_items_after_craft(inventory, item, craft_data.count)
 
         await BaseService.commit_or_rollback(self.session)
 
-        player_inventory = await get_player_inventory(self.session, player_id)
-        return serialize_items(player_inventory)
-
-    async def _update_inventory_items_after_craft(self, player: Player, item: Item) -> None:
-        player.inventory.sort(key=lambda i: i.count)
+        return serialize_items(player.inventory)
 
-        if not player.inventory or not any(inv.item == item for inv in player.inventory):
-            await create_player_inventory(self.session, player.id, item.id)
-        else:
-            for items in player.inventory:
-                if items.item_id == item.id and items.count < item.max_count:
-                    items.count += 1
-                    return
-            await create_player_inventory(self.session, player.id, item.id)
+    def _update_inventory_items_after_craft(self, inventory: InventoryContainer, item: Item, count: int) -> None:
+        # Top up the stacks that have room first, then open new full stacks for the rest.
+        while count > 0 and (stack := inventory.stacks.with_room(item.id, 1)) is not None:
+            added = min(item.max_count - stack.count, count)
+            stack.count += added
+            inventory.item_changed(stack)
+            count -= added
+        while count > 0:
+            stack_count = min(item.max_count, count)
+            new_item = create_inventory_item(self.session, item.id, inventory.player.id, count=stack_count)
+            new_item.item = item
+            inventory.add_item(new_item)
+            count -= stack_count
 
 
 class ItemTransferService(BaseTransferService):
     async def transfer(self, telegram_id: int, transfer_data: TransferItemSchema) -> PlayerItemsSchema:
-        player = await get_player_with_items(self.session, telegram_id, transfer_data.map_id)
+        player = await load_player(self.session, telegram_id, transfer_data.map_id, include=PLAYER_ITEMS_PROFILE)
         validate_player(player)
-        player_id = player.id
         can_player_transfer_items(player, transfer_data.direction.value)
         await self._update_items_after_transfer(player, transfer_data.item_id, transfer_data.direction.value,
                                                 transfer_data.count)
         await BaseService.commit_or_rollback(self.session)
-        player = await get_player_with_all_items(self.session, player_id)
         return serialize_player_items(player)
 
     async def _update_items_after_transfer(self, player: Player, item_id: int, direction: str, count: int) -> None:
@@ -153,13 +179,11 @@ class ItemTransferService(BaseTransferService):
             self,
             source_item: PlayerItemStorage | Inventory,
             count: int,
+            source_container: ItemContainer,
             target_container: ItemContainer
     ) -> None:
         max_count = source_item.item.max_count  # type: ignore[attr-defined]
-        existing_item = next(
-            (inv for inv in target_container.get_item() if
-             inv.item_id == source_item.item_id and inv.count < max_count), None
-        )
+        existing_item = target_container.stacks.with_room(source_item.item_id, source_item.tier)
         if existing_item:
             available_space = max_count - existing_item.count
             if count <= available_space:
@@ -167,73 +191,75 @@ class ItemTransferService(BaseTransferService):
             else:
                 existing_item.count = max_count
                 await target_container.create_item(self.session, source_item, count - available_space)
+            target_container.item_changed(existing_item)
         else:
             await target_container.create_item(self.session, source_item, count)
 
         if source_item.count <= count:
-            await self.session.delete(source_item)
+            await source_container.delete_item(self.session, source_item)
         else:
             source_item.count -= count
+            source_container.item_changed(source_item)
 
     async def _move_item_to_storage(self, player: Player, item_id: int, count: int) -> None:
         item = await inventory_repository.get_by_id(self.session, item_id)
         validate_item_before_transfer(item, player.id, count)
-        container = StorageContainer(player)
-        await self._move_item(item, count, container)
+        await self._move_item(item, count, InventoryContainer(player), StorageContainer(player))
 
     async def _move_item_from_storage(self, player: Player, item_id: int, count: int) -> None:
         item = await player_item_storage_repository.get_by_id(self.session, item_id)
         validate_item_before_transfer(item, player.id, count)
-        container = InventoryContainer(player)
-        await self._move_item(item, count, container)
+        await self._move_item(item, count, StorageContainer(player), InventoryContainer(player))
 
 
 class ItemEquipService(BaseService):
 
     async def equip(self, telegram_id: int, equip_data: EquipItemSchema) -> PlayerEquipItemResponseSchema:
-        player = await get_player_with_stats(self.session, telegram_id=telegram_id, map_id=equip_data.map_id)
+        player = await load_player(self.session, telegram_id, equip_data.map_id, include=PLAYER_ITEMS_PROFILE)
         validate_player(player)
-        player_id = player.id
-        player_inventory_item = await get_inventory_item_with_stats(self.session, player.id, equip_data.item_id)
+        player_inventory_item = next((item for item in player.inventory if item.id == equip_data.item_id), None)
         validate_inventory_item(player_inventory_item)
-        player_equip_item = await get_equip_item_with_specific_type(
-            self.session, player_id=player.id, item_type=player_inventory_item.item.type
+        player_equip_item = next(
+            (item for item in player.equip_item if item.item.type == player_inventory_item.item.type), None
         )
         await self.update_items(player, player_equip_item, player_inventory_item)
         await BaseService.commit_or_rollback(self.session)
 
-        player_items = await get_player_with_all_items(self.session, player_id)
-        return PlayerEquipItemResponseSchema(stats=player.stats, items=serialize_player_items(player_items))
+        return PlayerEquipItemResponseSchema(stats=player.stats, items=serialize_player_items(player))
 
     async def unequip(self, telegram_id: int, equip_data: EquipItemSchema) -> PlayerEquipItemResponseSchema:
-        player = await get_player_with_inventory_items(self.session, telegram_id=telegram_id, map_id=equip_data.map_id)
+        player = await load_player(self.session, telegram_id, equip_data.map_id, include=PLAYER_ITEMS_PROFILE)
         validate_player(player)
-        player_id = player.id
-        player_equip_item = await equip_item_repository.get(self.session, id=equip_data.item_id, player_id=player_id)
+        player_equip_item = next((item for item in player.equip_item if item.id == equip_data.item_id), None)
         validate_player_before_unequip_item(player_equip_item, player)
         self._update_stats(player_equip_item.item.stats, player, "unequip")
-        create_inventory_item(
-            self.session, player_equip_item.item_id, player.id, player_equip_item.tier
-        )
-        await self.session.delete(player_equip_item)
+        await self._move_to_inventory(player, player_equip_item)
         await BaseService.commit_or_rollback(self.session)
-        player_items = await get_player_with_all_items(self.session, player_id)
-        return PlayerEquipItemResponseSchema(stats=player.stats, items=serialize_player_items(player_items))
+        return PlayerEquipItemResponseSchema(stats=player.stats, items=serialize_player_items(player))
 
     async def update_items(self, player: Player, player_equip_item: EquipItem,
                            player_inventory_item: Inventory) -> None:
         if player_equip_item:
             self._update_stats(player_equip_item.item.stats, player, "unequip")
-            create_inventory_item(
-                self.session, player_equip_item.item_id, player.id, player_equip_item.tier
-            )
-            await self.session.delete(player_equip_item)
-        create_equip_item(
+            await self._move_to_inventory(player, player_equip_item)
+        equip_item = create_equip_item(
             self.session, player_id=player.id, item_id=player_inventory_item.item.id, tier=player_inventory_item.tier
         )
+        equip_item.item = player_inventory_item.item
+        player.equip_item.append(equip_item)
         self._update_stats(player_inventory_item.item.stats, player, "equip")
+        player.inventory.remove(player_inventory_item)
         await self.session.delete(player_inventory_item)
 
+    async def _move_to_inventory(self, player: Player, player_equip_item: EquipItem) -> None:
+        inventory_item = create_inventory_item(
+            self.session, player_equip_item.item_id, player.id, player_equip_item.tier
+        )
+        inventory_item.item = player_equip_item.item
+        player.inventory.append(inventory_item)
+        player.equip_item.remove(player_equip_item)
+        await self.session.delete(player_equip_item)
+
     def _update_stats(self, item_stats: ItemStat, player: Player, operation: str) -> None:
         for stat in item_stats.__annotations__:
             if stat != id:
@@ -1,13 +1,65 @@
+from collections import OrderedDict
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped
 
+from app.core.config import MAP_RESPONSE_CACHE_SIZE, MAP_TILE_SIZE
 from app.models.map import MapObject, MapObjectPosition
-from app.repository.map import (check_placement_on_map, get_map_objects,
+from app.repository.map import (get_map_changes, get_map_objects, get_map_objects_by_ids,
+                                get_map_objects_in_area, get_map_occupancy, get_map_version,
                                 map_object_position_repository,
                                 map_object_repository, map_repository)
-from app.schemas.map import (BaseMapSchema, MapObjectCreateSchema,
-                             MapObjectPositionSchema, MapResponseSchema)
-from app.validation.map import validate_map_bounds
+from app.repository.map_index import map_index_cache
+from app.schemas.map import (BaseMapSchema, MapChangesSchema, MapObjectChangeSchema,
+                             MapObjectCreateSchema, MapObjectOccupancySchema,
+                             MapObjectPositionSchema, MapObjectResponseSchema, MapResponseSchema,
+                             MapTileSchema)
+from app.validation.map import validate_map, validate_map_tile
+
+
+class MapResponseCache:
+    """Serialized map and map tile bodies for the latest version of each map, least recently used first out.
+
+    Versions are the maps.version column, moved by triggers on every committed map change, so each
+    process checks its bodies against the version all of them share. A body is built after its
+    version was read and is never older than it; bodies of older versions are never served and age
+    out with the rest.
+    """
+
+    def __init__(self, size: int = MAP_RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._bodies: OrderedDict[tuple[int, tuple[int, int] | None], tuple[int, bytes]] = OrderedDict()
+
+    @staticmethod
+    def etag(map_id: int, version: int, tile: tuple[int, int] | None = None) -> str:
+        suffix = f"-{tile[0]}.{tile[1]}" if tile else ""
+        return f'"{map_id}-{version}{suffix}"'
+
+    def get(self, map_id: int, version: int, tile: tuple[int, int] | None = None) -> bytes | None:
+        cached_version, body = self._bodies.get((map_id, tile), (None, None))
+        if cached_version != version:
+            return None
+        self._bodies.move_to_end((map_id, tile))
+        return body
+
+    def put(self, map_id: int, version: int, body: bytes, tile: tuple[int, int] | None = None) -> None:
+        # A slower request may still be building the body of a version another one already replaced.
+        cached_version, _ = self._bodies.get((map_id, tile), (None, None))
+        if cached_version is not None and cached_version > version:
+            return
+        self._bodies[(map_id, tile)] = (version, body)
+        self._bodies.move_to_end((map_id, tile))
+        while len(self._bodies) > self.size:
+            self._bodies.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def clear(self) -> None:
+        self._bodies.clear()
+
+
+map_response_cache = MapResponseCache()
 
 
 class MapService:
@@ -20,8 +72,66 @@ class MapService:
 
     async def get_map_with_objects(self, map_id: int) -> MapResponseSchema:
         map_objects = await get_map_objects(self.session, map_id=map_id)
+        validate_map(map_objects)
         return MapResponseSchema.model_validate(map_objects)
 
+    async def get_version(self, map_id: int) -> int:
+        version = await get_map_version(self.session, map_id)
+        validate_map(version)
+        return version
+
+    async def get_map_body(self, map_id: int, version: int) -> bytes:
+        """Serialized map, rebuilt only when the map version changed."""
+        body = map_response_cache.get(map_id, version)
+        if body is None:
+            body = (await self.get_map_with_objects(map_id)).model_dump_json().encode()
+            map_response_cache.put(map_id, version, body)
+        return body
+
+    async def get_tile(self, map_id: int, x: int, y: int) -> MapTileSchema:
+        grid = await map_index_cache.get(self.session, map_id)
+        validate_map(grid)
+        validate_map_tile(x, y, MAP_TILE_SIZE, grid.width, grid.height)
+        x1, y1 = x * MAP_TILE_SIZE, y * MAP_TILE_SIZE
+        map_objects = await get_map_objects_in_area(
+            self.session, map_id, x1, y1, x1 + MAP_TILE_SIZE - 1, y1 + MAP_TILE_SIZE - 1
+        )
+        return MapTileSchema(
+            map_id=map_id,
+            x=x,
+            y=y,
+            size=MAP_TILE_SIZE,
+            map_objects=[MapObjectResponseSchema.model_validate(map_object) for map_object in map_objects],
+        )
+
+    async def get_tile_body(self, map_id: int, x: int, y: int, version: int) -> bytes:
+        body = map_response_cache.get(map_id, version, (x, y))
+        if body is None:
+            body = (await self.get_tile(map_id, x, y)).model_dump_json().encode()
+            map_response_cache.put(map_id, version, body, (x, y))
+        return body
+
+    async def get_changes(self, map_id: int, since: int) -> MapChangesSchema:
+        version = await self.get_version(map_id)
+        changes = await get_map_changes(self.session, map_id, since, version) if 0 < since < version else []
+        # Versions trimmed from map_changes or moved by a resize leave a gap only a snapshot covers.
+        if since == 0 or since > version or len(changes) != version - since:
+            return MapChangesSchema(version=version, snapshot=await self.get_map_with_objects(map_id))
+        map_object_ids = sorted({change.map_object_id for change in changes})
+        map_objects = await get_map_objects_by_ids(self.session, map_id, map_object_ids) if map_object_ids else []
+        return MapChangesSchema(
+            version=version,
+            changes=[MapObjectChangeSchema.model_validate(change) for change in changes],
+            map_objects=[MapObjectResponseSchema.model_validate(map_object) for map_object in map_objects],
+        )
+
+    async def get_occupancy(self, map_id: int) -> list[MapObjectOccupancySchema]:
+        # Players move all the time, so this is counted on each call rather than cached with the map.
+        map_ = await map_repository.get_by_id(self.session, map_id)
+        validate_map(map_)
+        occupancy = await get_map_occupancy(self.session, map_id)
+        return [MapObjectOccupancySchema.model_validate(row) for row in occupancy]
+
     async def create_map_object(self, name: str | Mapped[str], map_id: int) -> MapObject:
         new_map_object = await map_object_repository.create(
             self.session,
@@ -34,18 +144,13 @@ class MapService:
         )
         return new_map_object
 
-    async def area_is_free(self, map_id: int, x1: int, y1: int, x2: int, y2: int) -> bool:
-        map_ = await map_repository.get_by_id(self.session, map_id)
-        validate_map_bounds(x2, y2, map_.width, map_.height)
-        return await check_placement_on_map(self.session, x1, y1, x2, y2, map_id)
-
 
 class MapObjectService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def add_position(
-            self, x1: int, y1: int, x2: int, y2: int, map_object_id: int
+            self, x1: int, y1: int, x2: int, y2: int, map_object: MapObject
     ) -> MapObjectPosition:
         new_map_object_position = await map_object_position_repository.create(
             self.session,
@@ -54,7 +159,7 @@ class MapObjectService:
                 y1=y1,
                 x2=x2,
                 y2=y2,
-                map_object_id=map_object_id
+                map_object_id=map_object.id
             )
         )
         return new_map_object_position
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from app.models import Player
+
+MAX_ENERGY = 100
+MAX_HEALTH = 100
+# Energy and health points per minute while the player rests at their base.
+RECOVERY_REGEN_RATE = 1
+
+
+def regenerate(player: Player, now: datetime | None = None) -> None:
+    """Turn the time since player.regen_updated_at into energy and health.
+
+    Only whole points are credited and the anchor moves by exactly the time they took, so the
+    remainder keeps accruing and the result doesn't depend on how often this is called.
+    """
+    if player.regen_rate <= 0:
+        return
+    now = now or datetime.now()
+    points = int((now - player.regen_updated_at).total_seconds() * player.regen_rate // 60)
+    if points <= 0:
+        return
+    player.energy = min(MAX_ENERGY, player.energy + points)
+    player.health = min(MAX_HEALTH, player.health + points)
+    if player.energy == MAX_ENERGY and player.health == MAX_HEALTH:
+        player.regen_updated_at = now
+    else:
+        player.regen_updated_at += timedelta(seconds=points * 60 / player.regen_rate)
+
+
+def set_player_status(player: Player, status: str, now: datetime | None = None) -> None:
+    now = now or datetime.now()
+    regenerate(player, now)
+    player.status = status
+    regen_rate = RECOVERY_REGEN_RATE if status == "recovery" else 0
+    if player.regen_rate != regen_rate:
+        player.regen_rate = regen_rate
+        player.regen_updated_at = now
@@ -2,11 +2,9 @@ from typing import Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Player, PlayerResources
-from app.repository import (create_inventory_resource, create_storage_resource,
-                            get_player_with_all_resources,
-                            get_player_with_resources_for_transfer,
-                            player_resource_repository)
+from app.models import Player, PlayerResources, PlayerResourcesStorage
+from app.repository import (PLAYER_RESOURCES_PROFILE, create_inventory_resource, create_storage_resource,
+                            load_player, player_resource_repository)
 from app.schemas import PlayerResourcesSchema, TransferResourceSchema
 from app.serialization.player import serialize_player_resources
 from app.services.base import BaseService, BaseTransferService
@@ -21,40 +19,66 @@ class ResourceService(BaseService):
         return player_resources
 
     @staticmethod
-    def get_resource_count_after_farming(total_minutes: int):
-        multiplier = 1
-        total_resource_quantity = 0
-        for minutes in range(1, total_minutes + 1):
-            if minutes % 5 == 0:
-                multiplier += 1
-            total_resource_quantity += 1 * multiplier
-        return total_resource_quantity
+    def get_resource_count_after_farming(total_minutes: int, base_gain: int = 1, multiplier_interval: int = 5) -> int:
+        # Minute m yields base_gain * (1 + m // multiplier_interval), so the sum has a closed form.
+        if total_minutes <= 0:
+            return 0
+        full_steps, rest = divmod(total_minutes, multiplier_interval)
+        bonus = multiplier_interval * full_steps * (full_steps - 1) // 2 + full_steps * (rest + 1)
+        return base_gain * (total_minutes + bonus)
 
 
 class ResourceTransferService(BaseTransferService):
     async def transfer(self, telegram_id: int, transfer_data: TransferResourceSchema) -> PlayerResourcesSchema:
-        player = await get_player_with_resources_for_transfer(
-            self.session,
-            telegram_id,
-            transfer_data.map_id,
-            transfer_data.resource_id
+        player = await load_player(self.session, telegram_id, transfer_data.map_id, include=PLAYER_RESOURCES_PROFILE)
+        player_resource = storage_resource = None
+        if player and player.base:
+            player_resource = self._find_resource(player.resources, transfer_data.resource_id)
+            storage_resource = self._find_resource(player.base.resources, transfer_data.resource_id)
+        can_player_transfer_resources(
+            player, player_resource, storage_resource, transfer_data.count, transfer_data.direction.value
+        )
+        await self._update_resources(
+            transfer_data.direction.value, transfer_data.count, player, player_resource, storage_resource
         )
-        can_player_transfer_resources(player, transfer_data.count, transfer_data.direction.value)
-        self._update_resources(transfer_data.direction.value, transfer_data.count, player, transfer_data.resource_id)
         await BaseService.commit_or_rollback(self.session)
-        player = await get_player_with_all_resources(self.session, telegram_id, transfer_data.map_id)
         return serialize_player_resources(player)
 
-    def _update_resources(self, direction: str, count: int, player: Player, resource_id: int) -> None:
+    @staticmethod
+    def _find_resource(
+            resources: list[PlayerResources] | list[PlayerResourcesStorage], resource_id: int
+    ) -> PlayerResources | PlayerResourcesStorage | None:
+        return next((resource for resource in resources if resource.resource_id == resource_id), None)
+
+    async def _update_resources(
+            self,
+            direction: str,
+            count: int,
+            player: Player,
+            player_resource: PlayerResources | None,
+            storage_resource: PlayerResourcesStorage | None
+    ) -> None:
         if direction == "to_storage":
-            if player.base.resources:
-                player.base.resources[0].resource_quantity += count
+            resource_id = player_resource.resource_id
+            await BaseService.update_resources(self.session, [(player.id, resource_id, -count)])
+            if storage_resource:
+                await BaseService.update_resources(
+                    self.session, [(player.id, resource_id, count)], PlayerResourcesStorage
+                )
             else:
-                create_storage_resource(self.session, resource_id, count, player.base.id, player.id)
-            player.resources[0].resource_quantity -= count
+                storage_resource = create_storage_resource(
+                    self.session, resource_id, count, player.base.id, player.id
+                )
+                storage_resource.resource = player_resource.resource
+                player.base.resources.append(storage_resource)
         elif direction == "from_storage":
-            if player.resources:
-                player.resources[0].resource_quantity += count
+            resource_id = storage_resource.resource_id
+            await BaseService.update_resources(
+                self.session, [(player.id, resource_id, -count)], PlayerResourcesStorage
+            )
+            if player_resource:
+                await BaseService.update_resources(self.session, [(player.id, resource_id, count)])
             else:
-                create_inventory_resource(self.session, resource_id, count, player.id)
-            player.base.resources[0].resource_quantity -= count
+                player_resource = create_inventory_resource(self.session, resource_id, count, player.id)
+                player_resource.resource = storage_resource.resource
+                player.resources.append(player_resource)
@@ -0,0 +1,109 @@
+from collections import defaultdict
+
+from app.models import Player, PlayerResourcesStorage
+from app.repository import PLAYER_FULL_PROFILE, create_inventory_resource, create_storage_resource, load_player
+from app.schemas.base import TransferKind
+from app.schemas.player import BulkTransferResponseSchema, BulkTransferSchema, TransferLineSchema
+from app.serialization.item import serialize_player_items
+from app.serialization.player import serialize_player_resources
+from app.services.base import BaseService
+from app.services.item import InventoryContainer, ItemTransferService, StorageContainer
+from app.validation.item import validate_item_before_transfer
+from app.validation.player import (can_player_transfer_items, can_player_transfer_resources, validate_inventory_room,
+                                   validate_player)
+
+
+class BulkTransferService(ItemTransferService):
+    """Moves several item stacks and resources between inventory and storage in one transaction.
+
+    Every line is validated against the state before the transfer, lines for the same stack or
+    resource and direction are added up, and nothing is applied unless all of them pass. The
+    inventory only has to fit once every line is moved, so stacks sent to storage make room for
+    the ones taken out in the same batch.
+    """
+
+    async def transfer(self, telegram_id: int, transfer_data: BulkTransferSchema) -> BulkTransferResponseSchema:
+        player = await load_player(self.session, telegram_id, transfer_data.map_id, include=PLAYER_FULL_PROFILE)
+        validate_player(player)
+        item_moves = self._validate_item_lines(player, transfer_data.lines)
+        resource_moves = self._validate_resource_lines(player, transfer_data.lines)
+
+        # The same containers for every line, so their stack indexes are built once.
+        inventory, storage = InventoryContainer(player), StorageContainer(player)
+        free_slots = inventory.stacks.free_slots
+        for item, count, direction in item_moves:
+            if direction == "to_storage":
+                await self._move_item(item, count, inventory, storage)
+            else:
+                await self._move_item(item, count, storage, inventory)
+        # Raising before the commit drops every move of the batch with the session.
+        validate_inventory_room(inventory.stacks, free_slots)
+        await self._move_resources(player, resource_moves)
+
+        await BaseService.commit_or_rollback(self.session)
+        return BulkTransferResponseSchema(
+            items=serialize_player_items(player), resources=serialize_player_resources(player)
+        )
+
+    @staticmethod
+    def _validate_item_lines(player: Player, lines: list[TransferLineSchema]) -> list[tuple]:
+        counts: dict[tuple[str, int], int] = defaultdict(int)
+        for line in lines:
+            if line.kind == TransferKind.ITEM:
+                counts[(line.direction.value, line.id)] += line.count
+
+        stacks: dict[str, dict] = {}
+        moves = []
+        for (direction, stack_id), count in counts.items():
+            can_player_transfer_items(player, direction)
+            if direction not in stacks:
+                source = player.inventory if direction == "to_storage" else player.base.items
+                stacks[direction] = {item.id: item for item in source}
+            item = stacks[direction].get(stack_id)
+            validate_item_before_transfer(item, player.id, count)
+            moves.append((item, count, direction))
+        return moves
+
+    @staticmethod
+    def _validate_resource_lines(player: Player, lines: list[TransferLineSchema]) -> dict[tuple[int, str], int]:
+        counts: dict[tuple[int, str], int] = defaultdict(int)
+        for line in lines:
+            if line.kind == TransferKind.RESOURCE:
+                counts[(line.id, line.direction.value)] += line.count
+
+        inventory = {resource.resource_id: resource for resource in player.resources}
+        storage = {resource.resource_id: resource for resource in player.base.resources} if player.base else {}
+        for (resource_id, direction), count in counts.items():
+            can_player_transfer_resources(
+                player, inventory.get(resource_id), storage.get(resource_id), count, direction
+            )
+        return counts
+
+    async def _move_resources(self, player: Player, counts: dict[tuple[int, str], int]) -> None:
+        # Net change of the inventory quantity per resource; storage changes by the opposite amount.
+        deltas: dict[int, int] = defaultdict(int)
+        for (resource_id, direction), count in counts.items():
+            deltas[resource_id] += -count if direction == "to_storage" else count
+
+        inventory = {resource.resource_id: resource for resource in player.resources}
+        storage = {resource.resource_id: resource for resource in player.base.resources} if player.base else {}
+        inventory_deltas = [
+            (player.id, resource_id, delta) for resource_id, delta in deltas.items() if delta and resource_id in inventory
+        ]
+        storage_deltas = [
+            (player.id, resource_id, -delta) for resource_id, delta in deltas.items() if delta and resource_id in storage
+        ]
+        await BaseService.update_resources(self.session, inventory_deltas)
+        await BaseService.update_resources(self.session, storage_deltas, PlayerResourcesStorage)
+
+        for resource_id, delta in deltas.items():
+            if delta > 0 and resource_id not in inventory:
+                player_resource = create_inventory_resource(self.session, resource_id, delta, player.id)
+                player_resource.resource = storage[resource_id].resource
+                player.resources.append(player_resource)
+            elif delta < 0 and resource_id not in storage:
+                storage_resource = create_storage_resource(
+                    self.session, resource_id, -delta, player.base.id, player.id
+                )
+                storage_resource.resource = inventory[resource_id].resource
+                player.base.resources.append(storage_resource)
@@ -1,8 +1,9 @@
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import BASE_SIZE
 from app.models import Map, MapObject
-from app.repository import check_placement_on_map, map_repository
+from app.repository import MapGrid, check_placement_on_map, map_index_cache
 from app.schemas import PlayerBaseCreateSchema
 
 
@@ -10,12 +11,7 @@ def validate_map_object(map_object: MapObject):
     if not map_object:
         raise HTTPException(status_code=404, detail="Map object not found")
 
-async def area_is_free(map_id: int, x1: int, y1: int, x2: int, y2: int) -> bool:
-    map_ = await map_repository.get_by_id(session, map_id)
-    validate_map_bounds(x2, y2, map_.width, map_.height)
-    return await check_placement_on_map(session, x1, y1, x2, y2, map_id)
-
-def validate_map(map: Map):
+def validate_map(map: Map | MapGrid | int | None):
     if map is None:
         raise HTTPException(status_code=404, detail="Map not found")
 
@@ -23,18 +19,27 @@ def validate_map_bounds(x2: int, y2: int, width: int, height: int):
     if x2 > width or y2 > height:
         raise HTTPException(status_code=422, detail="Coordinates cannot go beyond the map")
 
+def validate_map_tile(x: int, y: int, tile_size: int, width: int, height: int):
+    if x * tile_size > width or y * tile_size > height:
+        raise HTTPException(status_code=404, detail="Tile not found")
+
 async def validate_map_area(
         session: AsyncSession,
         x1: int,
         y1: int,
         map_id: int,
 ) -> None:
-    x2, y2 = x1 + 1, y1 + 1
+    x2, y2 = x1 + BASE_SIZE - 1, y1 + BASE_SIZE - 1
 
-    map_ = await map_repository.get_by_id(session, map_id)
-    validate_map_bounds(x2, y2, map_.width, map_.height)
+    grid = await map_index_cache.get(session, map_id)
+    validate_map(grid)
+    validate_map_bounds(x2, y2, grid.width, grid.height)
 
+    if not grid.is_free(x1, y1, x2, y2):
+        raise HTTPException(status_code=409, detail="The place is already taken")
     if not await check_placement_on_map(session, x1, y1, x2, y2, map_id):
+        # Another worker built here after our grid was loaded.
+        map_index_cache.invalidate(map_id)
         raise HTTPException(status_code=409, detail="The place is already taken")
 
 
@@ -2,7 +2,10 @@ from typing import Sequence
 
 from fastapi import HTTPException
 
-from app.models import Inventory, Item, Player, PlayerResources, EquipItem, BuildingCost, ItemRecipe
+from app.models import (Inventory, Item, Player, PlayerResources, PlayerResourcesStorage, EquipItem, BuildingCost,
+                        ItemRecipe)
+from app.repository.catalog import CatalogCost
+from app.repository.stack_index import StackIndex
 from app.validation.map import is_farmable_area
 
 
@@ -14,33 +17,31 @@ def validate_player(player: Player | None) -> None:
 def validate_player_before_unequip_item(player_equip_item: EquipItem, player: Player) -> None:
     if not player_equip_item:
         raise HTTPException(status_code=404, detail="Item not found")
-    if player.inventory_slots <= len(player.inventory):
+    if player.inventory_slots <= player.used_slots:
+        raise HTTPException(status_code=400, detail="Inventory is full")
+
+
+def validate_inventory_room(stacks: StackIndex, free_slots_before: int) -> None:
+    # An inventory that was already over its slots may stay that way, as long as it doesn't grow.
+    if stacks.free_slots < min(free_slots_before, 0):
         raise HTTPException(status_code=400, detail="Inventory is full")
 
 
 def does_player_have_enough_resources(
-        costs: Sequence[BuildingCost] | Sequence[ItemRecipe],
-        player_resources: Sequence[PlayerResources]
+        costs: Sequence[BuildingCost] | Sequence[ItemRecipe] | Sequence[CatalogCost],
+        player_resources: Sequence[PlayerResources],
+        count: int = 1,
 ) -> bool:
     if not player_resources:
         return False
     player_resource_dict = {res.resource_id: res.resource_quantity for res in player_resources}
     for cost in costs:
-        if player_resource_dict.get(cost.resource_id, 0) < cost.resource_quantity:
+        if player_resource_dict.get(cost.resource_id, 0) < cost.resource_quantity * count:
             return False
     return True
 
 
-def does_player_have_empty_slot(player: Player, craft_item: Item) -> bool:
-    for item in player.inventory:
-        if item.item_id == craft_item.id and item.count < craft_item.max_count:
-            return True
-    if player.inventory_slots > len(player.inventory):
-        return True
-    return False
-
-
-def can_player_craft_item(player: Player, item: Item) -> None:
+def can_player_craft_item(player: Player, item: Item, count: int = 1, stacks: StackIndex | None = None) -> None:
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
     # if not player.base:
@@ -49,9 +50,10 @@ def can_player_craft_item(player: Player, item: Item) -> None:
     #     raise HTTPException(status_code=400, detail="The player is not at the base")
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    if not does_player_have_enough_resources(item.recipe, player.resources):
+    if not does_player_have_enough_resources(item.recipe, player.resources, count):
         raise HTTPException(status_code=400, detail="Not enough resources")
-    if not does_player_have_empty_slot(player, item):
+    stacks = stacks or StackIndex(player.inventory, player.inventory_slots - player.used_slots)
+    if stacks.capacity(item.id, 1, item.max_count) < count:
         raise HTTPException(status_code=400, detail="Inventory is full")
 
 
@@ -68,6 +70,8 @@ def can_player_transfer_items(player: Player, direction: str) -> None:
 
 def can_player_transfer_resources(
         player: Player,
+        player_resource: PlayerResources | None,
+        storage_resource: PlayerResourcesStorage | None,
         count: int,
         direction: str,
 ) -> None:
@@ -78,14 +82,14 @@ def can_player_transfer_resources(
     if player.map_object_id != player.base.map_object_id:
         raise HTTPException(status_code=404, detail="The player is not at the base")
     if direction == "to_storage":
-        if not player.resources:
+        if not player_resource:
             raise HTTPException(status_code=400, detail="Not enough resources")
-        if player.resources[0].resource_quantity < count:
+        if player_resource.resource_quantity < count:
             raise HTTPException(status_code=400, detail="Not enough resources")
     if direction == "from_storage":
-        if not player.base.resources:
+        if not storage_resource:
             raise HTTPException(status_code=400, detail="Not enough resources")
-        if player.base.resources[0].resource_quantity < count:
+        if storage_resource.resource_quantity < count:
             raise HTTPException(status_code=400, detail="Not enough resources")
 
 
@@ -0,0 +1,92 @@
+"""Latency of the ASGI UserMiddleware against the former BaseHTTPMiddleware version.
+
+Usage: DEV=True python -m benchmarks.auth_middleware [requests]
+
+Both apps share the same routes and CORS setup; only the auth middleware differs.
+The endpoints used here do not touch Postgres, so the numbers isolate the middleware stack.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from aiogram.utils.web_app import WebAppUser
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import DEV
+from app.depends.deps import verify_init_data
+from app.main import AUTH_EXCLUDED_PATHS, app
+
+ENDPOINTS = [
+    "/resources/farming/?total_minutes=60",
+    "/openapi.json",
+]
+
+
+class LegacyUserMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if not DEV:
+            if request.url.path in AUTH_EXCLUDED_PATHS:
+                return await call_next(request)
+            token = request.headers.get("Authorization")
+            if not token:
+                return JSONResponse(status_code=401, content={"detail": "Token is missing"})
+            try:
+                request.state.user = verify_init_data(token)
+            except HTTPException:
+                return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+        else:
+            request.state.user = WebAppUser(first_name="Tom", username="tom", id=111, photo_url="photo_url_tom")
+
+        return await call_next(request)
+
+
+def build_legacy_app() -> FastAPI:
+    legacy_app = FastAPI(routes=app.routes)
+    legacy_app.add_middleware(LegacyUserMiddleware)
+    legacy_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return legacy_app
+
+
+async def measure(target: FastAPI, url: str, requests: int) -> list[float]:
+    timings = []
+    async with AsyncClient(
+            transport=ASGITransport(app=target), base_url="http://bench/", headers={"authorization": "bench"}
+    ) as client:
+        for _ in range(50):
+            await client.get(url)
+        for _ in range(requests):
+            start = time.perf_counter()
+            await client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def describe(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    return f"mean {statistics.mean(timings):.3f} ms  p50 {statistics.median(timings):.3f} ms  p99 {p99:.3f} ms"
+
+
+async def main(requests: int) -> None:
+    legacy_app = build_legacy_app()
+    for url in ENDPOINTS:
+        before = await measure(legacy_app, url, requests)
+        after = await measure(app, url, requests)
+        print(url)
+        print(f"  BaseHTTPMiddleware: {describe(before)}")
+        print(f"  ASGI middleware:    {describe(after)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,141 @@
+"""Query plans of the hot lookup paths on a database seeded with many players.
+
+Usage: python -m benchmarks.query_plans [players]
+
+Recreates the schema in the TEST_POSTGRES_* database (the same one the test suite drops),
+seeds it with generate_series, runs the hot paths through the real repository code while
+capturing the SQL they send, then EXPLAINs every captured statement.
+Exits with status 1 if any of them sequentially scans one of the per-player tables.
+"""
+import asyncio
+import sys
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import TEST_DATABASE_URL
+from app.models import PlayerResources, PlayerResourcesStorage
+from app.models.base import Base
+from app.repository import (PLAYER_FULL_PROFILE, apply_resource_deltas, farm_session_repository,
+                            get_overdue_farm_sessions, load_player)
+
+PER_PLAYER_TABLES = [
+    "players",
+    "player_stats",
+    "players_resources",
+    "inventories",
+    "equip_items",
+    "players_bases",
+    "players_resources_storage",
+    "players_items_storage",
+    "farm_sessions",
+]
+
+MAP_OBJECTS = 1000
+RESOURCES = 5
+ITEMS = 20
+
+SEED = [
+    "INSERT INTO maps (id, height, width) VALUES (1, 1000, 1000)",
+    f"INSERT INTO resources (id, name, icon) SELECT g, 'resource ' || g, '' FROM generate_series(1, {RESOURCES}) g",
+    f"""INSERT INTO items (id, name, icon, max_count, type, can_equip)
+        SELECT g, 'item ' || g, '', 10, 'weapon', true FROM generate_series(1, {ITEMS}) g""",
+    "INSERT INTO item_stats (item_id, damage, armor) SELECT id, 1, 1 FROM items",
+    f"""INSERT INTO map_objects (id, name, map_id, type, is_farmable)
+        SELECT g, 'object ' || g, 1, 'field', g % 2 = 0 FROM generate_series(1, {MAP_OBJECTS}) g""",
+    """INSERT INTO map_objects_position (x1, y1, x2, y2, map_object_id)
+        SELECT g % 100 * 10, g / 100 * 10, g % 100 * 10 + 9, g / 100 * 10 + 9, g FROM map_objects g(g)""",
+    """INSERT INTO players (id, player_id, name, health, energy, inventory_slots, status, map_id, map_object_id,
+                            regen_rate, regen_updated_at)
+        SELECT g, 1000000 + g, 'Player', 100, CASE WHEN g % 100 = 0 THEN 50 ELSE 100 END, 10,
+               CASE WHEN g % 100 = 0 THEN 'recovery' ELSE 'waiting' END, 1, g % {objects} + 1,
+               0, now()
+        FROM generate_series(1, :players) g""".format(objects=MAP_OBJECTS),
+    "INSERT INTO player_stats (player_id, damage, armor) SELECT id, 0, 0 FROM players",
+    f"""INSERT INTO players_resources (player_id, resource_id, resource_quantity)
+        SELECT p.id, r, 10 FROM players p, generate_series(1, {RESOURCES}) r""",
+    f"INSERT INTO inventories (player_id, item_id, tier, count) SELECT id, id % {ITEMS} + 1, 1, 1 FROM players",
+    f"""INSERT INTO equip_items (player_id, item_id, tier)
+        SELECT id, id % {ITEMS} + 1, 1 FROM players WHERE id % 2 = 0""",
+    """INSERT INTO players_bases (id, defense_level, map_object_id, map_id, owner_id)
+        SELECT id, 1, map_object_id, 1, id FROM players WHERE id % 10 = 0""",
+    f"""INSERT INTO players_resources_storage (player_base_id, player_id, resource_id, resource_quantity)
+        SELECT b.id, b.owner_id, r, 10 FROM players_bases b, generate_series(1, {RESOURCES}) r""",
+    f"""INSERT INTO players_items_storage (player_base_id, player_id, item_id, tier, count)
+        SELECT id, owner_id, id % {ITEMS} + 1, 1, 1 FROM players_bases""",
+    """INSERT INTO farm_sessions (start_time, end_time, status, base_gain, multiplier_interval, settled_minutes,
+                                  map_id, resource_id, player_id)
+        SELECT now(), now() + interval '1 hour', CASE WHEN g % 50 = 0 THEN 'in_progress' ELSE 'completed' END,
+               1, 5, 0, 1, 1, g
+        FROM generate_series(1, :players) g""",
+]
+
+
+async def seed(engine, players: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for stmt in SEED:
+            await conn.execute(text(stmt), {"players": players} if ":players" in stmt else {})
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+
+
+async def capture_hot_paths(engine, session_maker, players: int) -> list[tuple[str, tuple]]:
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    player_row_id = players // 2 // 10 * 10  # a player that owns a base
+    telegram_id = 1000000 + player_row_id
+    event.listen(engine.sync_engine, "after_cursor_execute", record)
+    try:
+        async with session_maker() as session:
+            await load_player(session, telegram_id, 1, include=PLAYER_FULL_PROFILE)
+            await farm_session_repository.get(session, player_id=player_row_id, status="in_progress", map_id=1)
+            await get_overdue_farm_sessions(session, datetime.now(), 1000)
+            await apply_resource_deltas(session, PlayerResources, [(player_row_id, 1, -1), (player_row_id, 2, 1)])
+            await apply_resource_deltas(session, PlayerResourcesStorage, [(player_row_id, 1, 1)])
+            await session.rollback()
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", record)
+    return captured
+
+
+async def explain(engine, captured: list[tuple[str, tuple]]) -> list[str]:
+    problems = []
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE")):
+                continue
+            result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(row[0] for row in result)
+            print(" ".join(statement.split())[:160])
+            print(plan, end="\n\n")
+            for table in PER_PLAYER_TABLES:
+                if f"Seq Scan on {table} " in plan + " ":
+                    problems.append(f"Seq Scan on {table}: {' '.join(statement.split())[:120]}")
+    return problems
+
+
+async def main(players: int) -> int:
+    engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        print(f"seeding {players} players...")
+        await seed(engine, players)
+        captured = await capture_hot_paths(engine, session_maker, players)
+        problems = await explain(engine, captured)
+    finally:
+        await engine.dispose()
+    for problem in problems:
+        print(problem)
+    print("OK" if not problems else f"{len(problems)} sequential scans on per-player tables")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)))
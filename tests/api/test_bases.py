@@ -1,5 +1,7 @@
 import pytest
 
+from app.models import MapObject, MapObjectPosition
+from app.repository import map_index_cache
 from app.schemas import BuildingType
 
 
@@ -93,3 +95,34 @@ async def test_build_base_on_non_exist_map(client, db_session, map_with_objects,
     assert response.status_code == 404
     response_json = response.json()
     assert response_json["detail"] == "Player not found"
+
+
+@pytest.mark.asyncio
+async def test_build_base_where_another_worker_just_built(client, db_session, map_with_objects, player_with_resources):
+    grid = await map_index_cache.get(db_session, 1)
+    assert grid.is_free(50, 50, 51, 51)
+
+    # Written behind this process' back, so the cached grid doesn't know about it.
+    map_object = MapObject(name="other base", type="base", map_id=1, is_farmable=False)
+    db_session.add(map_object)
+    await db_session.flush()
+    db_session.add(MapObjectPosition(x1=50, y1=50, x2=51, y2=51, map_object_id=map_object.id))
+    await db_session.commit()
+
+    response = await client.post("/bases/", json={"x1": 50, "y1": 50, "map_id": 1})
+
+    assert response.status_code == 409
+    assert not (await map_index_cache.get(db_session, 1)).is_free(50, 50, 51, 51)
+
+
+@pytest.mark.asyncio
+async def test_get_free_places_near_player(client, db_session, player_resources):
+    response = await client.get("/bases/free-places/", params={"map_id": 1, "limit": 2})
+    assert response.status_code == 200
+    assert response.json() == [{"x1": 16, "y1": 13}, {"x1": 13, "y1": 16}]
+
+    response = await client.post("/bases/", json={"x1": 16, "y1": 13, "map_id": 1})
+    assert response.status_code == 200
+
+    response = await client.get("/bases/free-places/", params={"map_id": 1, "x": 13, "y": 13, "limit": 1})
+    assert response.json() == [{"x1": 13, "y1": 16}]
@@ -1,4 +1,10 @@
 import pytest
+from sqlalchemy import update
+
+from app.models import (EquipItem, Inventory, Item, ItemRecipe, ItemStat, PlayerItemStorage, PlayerResources,
+                        Resource)
+from app.repository import game_catalog
+from tests.utils import QueryCounter
 
 
 @pytest.mark.asyncio
@@ -8,6 +14,7 @@ async def test_get_items_recipe(client, db_session, player_with_resources, items
     response_json = response.json()
     assert response_json[0]["name"] == "test_name"
     assert response_json[0]["can_craft"] == True
+    assert response_json[0]["max_craft_count"] == 2
     assert len(response_json[0]["recipe"]["resources"]) == 1
     assert response_json[0]["recipe"]["resources"][0]["name"] == "wood"
 
@@ -101,3 +108,130 @@ async def test_transfer_non_exist_item_to_storage(client, db_session, player_wit
     assert response.status_code == 404
     response_json = response.json()
     assert response_json["detail"] == "Player has no item"
+
+
+@pytest.mark.asyncio
+async def test_get_items_recipe_reads_catalog(client, db_session, player_with_resources, items_recipe):
+    await client.get("/items/recipes/", params={"map_id": 1})
+    with QueryCounter(db_session.bind) as counter:
+        response = await client.get("/items/recipes/", params={"map_id": 1})
+    assert response.status_code == 200
+    assert not any("items" in sql or "recipe_items" in sql for sql in counter.sql)
+
+    db_session.add(Resource(name="iron", icon="iron.svg"))
+    await db_session.commit()
+    version = (await game_catalog.get(db_session)).version
+    assert [resource["name"] for resource in (await client.get("/resources/")).json()] == ["wood", "stone"]
+    catalog = await game_catalog.reload(db_session)
+    assert catalog.version > version
+    assert [resource["name"] for resource in (await client.get("/resources/")).json()] == ["wood", "stone", "iron"]
+
+
+@pytest.mark.asyncio
+async def test_get_items_recipe_craftable_counts(client, db_session, player_with_resources, items_recipe):
+    db_session.add(Item(name="axe", icon="axe.svg", max_count=1, type="weapon", can_equip=True))
+    db_session.add(Item(name="wall", icon="wall.svg", max_count=1, type="armor", can_equip=True))
+    db_session.add(Item(name="stick", icon="stick.svg", max_count=1, type="weapon", can_equip=True))
+    await db_session.flush()
+    db_session.add(ItemRecipe(item_id=2, resource_id=1, resource_quantity=3))
+    db_session.add(ItemRecipe(item_id=2, resource_id=2, resource_quantity=7))
+    db_session.add(ItemRecipe(item_id=3, resource_id=2, resource_quantity=25))
+    await db_session.commit()
+
+    response = await client.get("/items/recipes/", params={"map_id": 1})
+    assert response.status_code == 200
+    assert [(item["name"], item["can_craft"], item["max_craft_count"]) for item in response.json()] == [
+        ("test_name", True, 2),
+        ("axe", True, 2),
+        ("wall", False, 0),
+        ("stick", True, None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_craft_many_items(client, db_session, player_with_resources, player_base):
+    db_session.add(Item(name="arrow", icon="arrow.svg", max_count=10, type="ammo", can_equip=False))
+    await db_session.flush()
+    db_session.add(ItemStat(item_id=1))
+    db_session.add(ItemRecipe(item_id=1, resource_id=1, resource_quantity=1))
+    db_session.add(Inventory(player_id=1, item_id=1, count=7))
+    await db_session.commit()
+
+    response = await client.patch("/items/craft/", json={"map_id": 1, "item_id": 1, "count": 8})
+    assert response.status_code == 200
+    assert sorted(item["count"] for item in response.json()) == [5, 10]
+    wood = await db_session.get(PlayerResources, 1)
+    await db_session.refresh(wood)
+    assert wood.resource_quantity == 2
+
+
+@pytest.mark.asyncio
+async def test_craft_many_items_not_enough_room(client, db_session, player, player_with_resources, player_base):
+    db_session.add(Item(name="arrow", icon="arrow.svg", max_count=1, type="ammo", can_equip=False))
+    await db_session.flush()
+    db_session.add(ItemStat(item_id=1))
+    db_session.add(ItemRecipe(item_id=1, resource_id=1, resource_quantity=1))
+    db_session.add(Inventory(player_id=1, item_id=1, count=1))
+    await db_session.commit()
+    # used_slots is kept by a trigger, and the client shares this session.
+    await db_session.refresh(player)
+    assert player.used_slots == 1
+
+    response = await client.patch("/items/craft/", json={"map_id": 1, "item_id": 1, "count": 11})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough resources"
+    response = await client.patch("/items/craft/", json={"map_id": 1, "item_id": 1, "count": 10})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inventory is full"
+
+
+@pytest.mark.asyncio
+async def test_transfer_item_to_storage_keeps_tiers_apart(client, db_session, player, player_base):
+    db_session.add(Item(name="arrow", icon="arrow.svg", max_count=10, type="ammo", can_equip=False))
+    await db_session.flush()
+    db_session.add(ItemStat(item_id=1))
+    db_session.add(Inventory(player_id=1, item_id=1, tier=2, count=3))
+    db_session.add(PlayerItemStorage(player_id=1, player_base_id=1, item_id=1, tier=1, count=4))
+    db_session.add(PlayerItemStorage(player_id=1, player_base_id=1, item_id=1, tier=2, count=9))
+    await db_session.commit()
+
+    response = await client.patch("/items/transfer/", json={
+        "map_id": 1,
+        "item_id": 1,
+        "count": 3,
+        "direction": "to_storage"
+    })
+    assert response.status_code == 200
+    storage_items = response.json()["storage_items"]
+    assert sorted((item["tier"], item["count"]) for item in storage_items) == [(1, 4), (2, 2), (2, 10)]
+
+
+@pytest.mark.asyncio
+async def test_used_slots_follow_inventory(client, db_session, player, player_with_items, player_base):
+    await db_session.refresh(player)
+    assert player.used_slots == 1
+
+    response = await client.delete("/items/1/", params={"count": 1, "map_id": 1, "item_location": "inventory"})
+    assert response.status_code == 200
+    await db_session.refresh(player)
+    assert player.used_slots == 0
+
+    player.inventory_slots = 1
+    db_session.add_all([EquipItem(player_id=1, item_id=1, tier=1), EquipItem(player_id=1, item_id=1, tier=2)])
+    await db_session.commit()
+    response = await client.patch("/items/unequip/", json={"map_id": 1, "item_id": 1})
+    assert response.status_code == 200
+    await db_session.refresh(player)
+    assert player.used_slots == 1
+
+    # Rewriting player_id with the same owner doesn't count the slot again.
+    await db_session.execute(update(Inventory).values(player_id=1))
+    await db_session.commit()
+    await db_session.refresh(player)
+    assert player.used_slots == 1
+
+    response = await client.patch("/items/unequip/", json={"map_id": 1, "item_id": 2})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inventory is full"
+    await db_session.refresh(player)
+    assert player.used_slots == 1
@@ -1,4 +1,9 @@
 import pytest
+from sqlalchemy import delete, update
+
+from app.models.map import Map, MapChange, MapObject
+from app.services.map import MapResponseCache, map_response_cache
+from tests.utils import QueryCounter
 
 
 @pytest.mark.asyncio
@@ -20,3 +25,168 @@ async def test_get_map(client, db_session, map_with_objects):
     response_json = response.json()
     assert response_json["id"] == 1
     assert len(response_json["map_objects"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_map_not_modified(client, db_session, map_with_objects):
+    response = await client.get("/maps/1/")
+    etag = response.headers["etag"]
+
+    response = await client.get("/maps/1/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_get_map_after_building_base(client, db_session, player_resources):
+    response = await client.get("/maps/1/")
+    etag = response.headers["etag"]
+    assert len(response.json()["map_objects"]) == 2
+
+    response = await client.post("/bases/", json={"x1": 1, "y1": 1, "map_id": 1})
+    assert response.status_code == 200
+
+    response = await client.get("/maps/1/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()["map_objects"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_map_after_direct_database_edit(client, db_session, map_with_objects):
+    response = await client.get("/maps/1/")
+    etag = response.headers["etag"]
+
+    # Another worker or an admin tool writing straight to Postgres moves the same version.
+    await db_session.execute(update(MapObject).where(MapObject.id == 2).values(name="old sawmill"))
+    await db_session.commit()
+
+    response = await client.get("/maps/1/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [map_object["name"] for map_object in response.json()["map_objects"]] == ["city", "old sawmill"]
+
+
+@pytest.mark.asyncio
+async def test_get_non_exist_map(client, db_session, map_with_objects):
+    response = await client.get("/maps/10/")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_map_occupancy(client, db_session, player):
+    response = await client.get("/maps/1/occupancy/")
+    assert response.status_code == 200
+    assert response.json() == [{"map_object_id": 1, "players": 1}, {"map_object_id": 2, "players": 0}]
+
+
+@pytest.mark.asyncio
+async def test_get_map_does_not_load_players(client, db_session, player):
+    with QueryCounter(db_session.bind) as counter:
+        response = await client.get("/maps/1/")
+    assert response.status_code == 200
+    assert not any(" players" in statement for statement in counter.sql)
+
+
+@pytest.mark.asyncio
+async def test_get_map_tile(client, db_session, map_with_objects):
+    response = await client.get("/maps/1/tiles/0/0/")
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["size"] == 32
+    assert [map_object["name"] for map_object in response_json["map_objects"]] == ["city"]
+
+    response = await client.get("/maps/1/tiles/1/1/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 200
+    assert [map_object["name"] for map_object in response.json()["map_objects"]] == ["sawmill"]
+
+    response = await client.get("/maps/1/tiles/1/1/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_get_map_tile_outside_map(client, db_session, map_with_objects):
+    # The map is 222 x 111, so the last tiles start at 192 and 96.
+    response = await client.get("/maps/1/tiles/6/3/")
+    assert response.status_code == 200
+
+    for x, y in ((7, 0), (0, 4), (1000000, 1000000)):
+        response = await client.get(f"/maps/1/tiles/{x}/{y}/")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Tile not found"
+    assert len(map_response_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_map_changes(client, db_session, player_resources):
+    response = await client.get("/maps/1/changes/", params={"since": 0})
+    assert response.status_code == 200
+    response_json = response.json()
+    assert len(response_json["snapshot"]["map_objects"]) == 2
+    version = response_json["version"]
+
+    response = await client.post("/bases/", json={"x1": 1, "y1": 1, "map_id": 1})
+    assert response.status_code == 200
+
+    response = await client.get("/maps/1/changes/", params={"since": version})
+    response_json = response.json()
+    assert response_json["snapshot"] is None
+    assert response_json["version"] == version + 3
+    assert [change["type"] for change in response_json["changes"]] == ["object_created", "position_set", "owner_set"]
+    assert [change["version"] for change in response_json["changes"]] == [version + 1, version + 2, version + 3]
+    assert [map_object["id"] for map_object in response_json["map_objects"]] == [3]
+
+    response = await client.get("/maps/1/changes/", params={"since": version + 3})
+    assert response.json()["changes"] == []
+
+
+@pytest.mark.asyncio
+async def test_get_map_changes_after_direct_database_edit(client, db_session, map_with_objects):
+    version = (await client.get("/maps/1/changes/")).json()["version"]
+
+    await db_session.execute(update(MapObject).where(MapObject.id == 2).values(name="old sawmill"))
+    await db_session.commit()
+
+    response_json = (await client.get("/maps/1/changes/", params={"since": version})).json()
+    assert response_json["version"] == version + 1
+    assert response_json["changes"] == [{"version": version + 1, "type": "object_updated", "map_object_id": 2}]
+    assert [map_object["name"] for map_object in response_json["map_objects"]] == ["old sawmill"]
+
+
+@pytest.mark.asyncio
+async def test_map_changes_fall_back_to_snapshot(client, db_session, map_with_objects):
+    version = (await client.get("/maps/1/changes/")).json()["version"]
+
+    # A resize moves the version without a logged change.
+    await db_session.execute(update(Map).where(Map.id == 1).values(width=333))
+    await db_session.commit()
+    response_json = (await client.get("/maps/1/changes/", params={"since": version})).json()
+    assert response_json["version"] == version + 1
+    assert response_json["snapshot"]["width"] == 333
+
+    # So does a change trimmed from the log.
+    await db_session.execute(update(MapObject).where(MapObject.id == 1).values(name="old city"))
+    await db_session.execute(delete(MapChange).where(MapChange.version == version + 2))
+    await db_session.commit()
+    response_json = (await client.get("/maps/1/changes/", params={"since": version + 1})).json()
+    assert response_json["snapshot"] is not None
+
+    response = await client.get("/maps/1/changes/", params={"since": version + 3})
+    assert response.json()["snapshot"] is not None
+
+
+def test_map_response_cache_evicts_least_recently_used():
+    cache = MapResponseCache(size=2)
+    cache.put(1, 5, b"map")
+    cache.put(1, 5, b"tile", (0, 0))
+    assert cache.get(1, 5) == b"map"
+
+    cache.put(1, 5, b"other tile", (1, 0))
+    assert len(cache) == 2
+    assert cache.get(1, 5, (0, 0)) is None
+    assert cache.get(1, 5) == b"map"
+    assert cache.get(1, 5, (1, 0)) == b"other tile"
+    assert cache.get(1, 6) is None
+
+    cache.put(1, 4, b"older map")
+    assert cache.get(1, 5) == b"map"
@@ -1,4 +1,16 @@
+import asyncio
+from datetime import datetime, timedelta
+
 import pytest
+from sqlalchemy import select
+
+from app.models import (EquipItem, FarmSession, Inventory, Player, PlayerItemStorage, PlayerResources,
+                        PlayerResourcesStorage, Resource)
+from app.repository import load_player
+from app.services import FarmingService
+from app.services.resource import ResourceService
+from tests.conftest import async_session_maker
+from tests.utils import QueryCounter
 
 
 @pytest.mark.asyncio
@@ -55,3 +67,249 @@ async def test_move_player_on_non_exist_map(client, db_session, map_with_objects
     assert response.status_code == 404
     response_json = response.json()
     assert response_json["detail"] == "Player not found"
+
+
+@pytest.mark.asyncio
+async def test_get_player_settles_finished_farm_session(client, db_session, player, resources):
+    player.status = "farming"
+    farm_session = FarmSession(
+        map_id=1,
+        resource_id=1,
+        player_id=1,
+        start_time=datetime.now() - timedelta(minutes=15),
+        end_time=datetime.now() - timedelta(minutes=5),
+    )
+    db_session.add(farm_session)
+    await db_session.commit()
+
+    response = await client.get("/players/1/")
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["status"] == "waiting"
+    assert response_json["energy"] == 90
+    assert response_json["farm_sessions"] is None
+    assert response_json["resources"][0]["count"] == 17
+
+
+async def _settle_in_own_session(farm_session_id: int, now: datetime | None = None) -> bool:
+    async with async_session_maker() as session:
+        player = await load_player(session, player_id=1, include={"resources"})
+        farm_session = await session.get(FarmSession, farm_session_id)
+        settled = await FarmingService(session).settle_farm_session(player, farm_session, now)
+        await session.commit()
+        return settled
+
+
+async def _add_finished_farm_session(db_session, player) -> FarmSession:
+    player.status = "farming"
+    farm_session = FarmSession(
+        map_id=1,
+        resource_id=1,
+        player_id=1,
+        start_time=datetime.now() - timedelta(minutes=15),
+        end_time=datetime.now() - timedelta(minutes=5),
+    )
+    db_session.add(farm_session)
+    await db_session.commit()
+    return farm_session
+
+
+@pytest.mark.asyncio
+async def test_concurrent_settlements_credit_once(db_session, player, resources):
+    farm_session = await _add_finished_farm_session(db_session, player)
+
+    results = await asyncio.gather(*(_settle_in_own_session(farm_session.id) for _ in range(2)))
+
+    assert sorted(results) == [False, True]
+    quantities = (await db_session.execute(select(PlayerResources.resource_quantity))).scalars().all()
+    assert quantities == [17]
+    await db_session.refresh(player)
+    assert player.energy == 90
+
+
+@pytest.mark.asyncio
+async def test_concurrent_settlements_see_each_others_credit(db_session, player, resources):
+    player.status = "farming"
+    start_time = datetime.now() - timedelta(minutes=20)
+    farm_session = FarmSession(
+        map_id=1, resource_id=1, player_id=1, start_time=start_time, end_time=start_time + timedelta(minutes=30)
+    )
+    db_session.add(farm_session)
+    await db_session.commit()
+
+    # The second settler loads the player before the first one commits, then settles two more minutes.
+    async with async_session_maker() as first, async_session_maker() as second:
+        players = [await load_player(session, player_id=1, include={"resources"}) for session in (first, second)]
+        for session, player_, minutes in ((first, players[0], 10), (second, players[1], 12)):
+            farm_session_ = await session.get(FarmSession, farm_session.id)
+            now = start_time + timedelta(minutes=minutes, seconds=1)
+            assert await FarmingService(session).settle_farm_session(player_, farm_session_, now)
+            await session.commit()
+
+    quantities = (await db_session.execute(select(PlayerResources.resource_quantity))).scalars().all()
+    assert quantities == [ResourceService.get_resource_count_after_farming(12)]
+    await db_session.refresh(player)
+    assert player.energy == 100 - 12
+
+
+@pytest.mark.asyncio
+async def test_concurrent_settlements_add_to_existing_stack_once(db_session, player_resources):
+    player = await db_session.get(Player, 1)
+    player.status = "farming"
+    farm_session = FarmSession(
+        map_id=1,
+        resource_id=1,
+        player_id=1,
+        start_time=datetime.now() - timedelta(minutes=15, seconds=30),
+        end_time=datetime.now() + timedelta(minutes=15),
+    )
+    db_session.add(farm_session)
+    await db_session.commit()
+
+    results = await asyncio.gather(*(_settle_in_own_session(farm_session.id) for _ in range(2)))
+
+    assert sorted(results) == [False, True]
+    await db_session.refresh(player_resources[0])
+    assert player_resources[0].resource_quantity == 10 + ResourceService.get_resource_count_after_farming(15)
+    await db_session.refresh(player)
+    assert player.energy == 100 - 15
+
+
+@pytest.mark.asyncio
+async def test_get_player_row_count_is_linear(client, db_session, player_base, item):
+    for resource_id in range(1, 11):
+        db_session.add(Resource(name=f"resource_{resource_id}", icon="icon.svg"))
+        db_session.add(PlayerResources(player_id=1, resource_id=resource_id, resource_quantity=1))
+        db_session.add(PlayerResourcesStorage(resource_id=resource_id, player_base_id=1, player_id=1,
+                                              resource_quantity=1))
+        db_session.add(Inventory(player_id=1, item_id=1))
+    for _ in range(6):
+        db_session.add(EquipItem(player_id=1, item_id=1, tier=1))
+    for _ in range(30):
+        db_session.add(PlayerItemStorage(item_id=1, player_id=1, player_base_id=1))
+    await db_session.commit()
+
+    with QueryCounter(db_session.bind) as counter:
+        response = await client.get("/players/1/")
+
+    assert response.status_code == 200
+    response_json = response.json()
+    assert len(response_json["resources"]) == 10
+    assert len(response_json["inventory_items"]) == 10
+    assert len(response_json["equip_items"]) == 6
+    assert counter.statements <= 8
+    assert counter.rows <= 100
+
+
+@pytest.mark.asyncio
+async def test_get_player_regenerates_energy_in_recovery(client, db_session, player):
+    anchor = datetime.now() - timedelta(seconds=90)
+    player.status = "recovery"
+    player.energy = 50
+    player.health = 99
+    player.regen_rate = 1
+    player.regen_updated_at = anchor
+    await db_session.commit()
+
+    response = await client.get("/players/1/")
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["energy"] == 51
+    assert response_json["health"] == 100
+    assert player.regen_updated_at == anchor + timedelta(minutes=1)
+
+
+@pytest.mark.asyncio
+async def test_move_player_to_base_starts_regeneration(client, db_session, player, player_outside_base):
+    response = await client.patch("/players/move/", json={"map_id": 1, "map_object_id": 2})
+    assert response.status_code == 200
+    await db_session.refresh(player)
+    assert player.status == "recovery"
+    assert player.regen_rate == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_transfer(client, db_session, player_with_items, player_with_resources, player_base_with_resources):
+    response = await client.patch("/players/transfer/", json={
+        "map_id": 1,
+        "lines": [
+            {"kind": "item", "id": 1, "count": 1, "direction": "to_storage"},
+            {"kind": "resource", "id": 1, "count": 4, "direction": "to_storage"},
+            {"kind": "resource", "id": 2, "count": 5, "direction": "to_storage"},
+            {"kind": "resource", "id": 1, "count": 2, "direction": "from_storage"},
+        ],
+    })
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["items"]["inventory_items"] is None
+    assert len(response_json["items"]["storage_items"]) == 1
+    resources = response_json["resources"]
+    assert {r["name"]: r["count"] for r in resources["player_resources"]} == {"wood": 8, "stone": 15}
+    assert {r["name"]: r["count"] for r in resources["storage_resources"]} == {"wood": 24, "stone": 5}
+
+
+@pytest.mark.asyncio
+async def test_bulk_transfer_is_atomic(client, db_session, player_with_items, player_with_resources,
+                                       player_base_with_resources):
+    response = await client.patch("/players/transfer/", json={
+        "map_id": 1,
+        "lines": [
+            {"kind": "item", "id": 1, "count": 1, "direction": "to_storage"},
+            {"kind": "resource", "id": 1, "count": 6, "direction": "to_storage"},
+            {"kind": "resource", "id": 1, "count": 6, "direction": "to_storage"},
+        ],
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough resources"
+    await db_session.refresh(player_with_items)
+    assert player_with_items.count == 1
+    wood = await db_session.get(PlayerResources, 1)
+    await db_session.refresh(wood)
+    assert wood.resource_quantity == 10
+
+
+@pytest.mark.asyncio
+async def test_bulk_transfer_rejects_overflowing_inventory(client, db_session, player_with_items,
+                                                           player_base_storage_with_items):
+    player = await db_session.get(Player, 1)
+    player.inventory_slots = 2
+    db_session.add(PlayerItemStorage(item_id=1, player_id=1, player_base_id=1))
+    await db_session.commit()
+    await db_session.refresh(player)
+    assert player.used_slots == 1
+
+    response = await client.patch("/players/transfer/", json={
+        "map_id": 1,
+        "lines": [
+            {"kind": "item", "id": 1, "count": 1, "direction": "from_storage"},
+            {"kind": "item", "id": 2, "count": 1, "direction": "from_storage"},
+        ],
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inventory is full"
+    async with async_session_maker() as session:
+        inventory = (await session.execute(select(Inventory.id))).scalars().all()
+        storage = (await session.execute(select(PlayerItemStorage.id))).scalars().all()
+    assert (len(inventory), len(storage)) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_bulk_transfer_frees_slots_for_the_same_batch(client, db_session, player_with_items,
+                                                            player_base_storage_with_items):
+    player = await db_session.get(Player, 1)
+    player.inventory_slots = 1
+    await db_session.commit()
+    await db_session.refresh(player)
+    assert player.used_slots == 1
+
+    response = await client.patch("/players/transfer/", json={
+        "map_id": 1,
+        "lines": [
+            {"kind": "item", "id": 1, "count": 1, "direction": "from_storage"},
+            {"kind": "item", "id": 1, "count": 1, "direction": "to_storage"},
+        ],
+    })
+    assert response.status_code == 200
+    response_json = response.json()
+    assert len(response_json["items"]["inventory_items"]) == 1
+    assert len(response_json["items"]["storage_items"]) == 1
@@ -1,7 +1,10 @@
 import pytest
 from sqlalchemy import select
 
-from app.models import Player, PlayerResourcesStorage
+from app.core.database import get_redis
+from app.main import app
+from app.models import Player, PlayerResources, PlayerResourcesStorage
+from app.repository import apply_resource_deltas
 
 # @pytest.mark.asyncio
 # async def test_start_farm(client, db_session, test_broker, map_with_objects, farming_mode):
@@ -75,3 +78,48 @@ async def test_transfer_resources_without_base(client, db_session, player_resour
     assert response.status_code == 404
     response_json = response.json()
     assert response_json["detail"] == "Player has no base"
+
+
+@pytest.mark.asyncio
+async def test_get_resource_count_after_farming(client):
+    response = await client.get("/resources/farming/", params={"total_minutes": 10})
+    assert response.status_code == 200
+    assert response.json() == 17
+
+
+@pytest.mark.asyncio
+async def test_resource_delta_is_guarded(db_session, player_resources):
+    updated = await apply_resource_deltas(db_session, PlayerResources, [(1, 1, -5), (1, 2, -25)])
+    assert updated == {(1, 1): 5}
+    assert player_resources[0].resource_quantity == 5
+    assert player_resources[1].resource_quantity == 20
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.stream = []
+
+    async def xadd(self, name, fields, **kwargs):
+        self.stream.append((name, fields))
+
+
+@pytest.fixture
+def recording_redis():
+    redis = RecordingRedis()
+    app.dependency_overrides[get_redis] = lambda: redis
+    yield redis
+    app.dependency_overrides.pop(get_redis, None)
+
+
+@pytest.mark.asyncio
+async def test_start_farm_publishes_task(client, db_session, player, resources_zone, recording_redis):
+    player.map_object_id = 2
+    await db_session.commit()
+
+    response = await client.patch("/resources/farm/start/", json={"map_id": 1, "total_minutes": 5})
+
+    assert response.status_code == 200
+    assert response.json()["total_seconds"] == 300
+    [(stream, fields)] = recording_redis.stream
+    assert stream == "farm_tasks"
+    assert fields["farm_session_id"] == 1
@@ -12,9 +12,11 @@ from app.models import (BuildingCost, Inventory, Item, ItemRecipe,
                         PlayerItemStorage, PlayerResources,
                         PlayerResourcesStorage, Resource, ResourcesZone, PlayerStats, ItemStat)
 from app.models.base import Base
+from app.repository import game_catalog, map_index_cache
+from app.services.map import map_response_cache
 
 engine = create_async_engine(TEST_DATABASE_URL, echo=False)
-async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
+async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
 def pytest_collection_modifyitems(items):
@@ -29,6 +31,9 @@ async def connection_test():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+    map_index_cache.invalidate()
+    game_catalog.invalidate()
+    map_response_cache.clear()
 
 
 @pytest.fixture()
@@ -0,0 +1,22 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine.sync_engine
+        self.statements = 0
+        self.rows = 0
+        self.sql: list[str] = []
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements += 1
+        self.sql.append(statement)
+        self.rows += max(cursor.rowcount, 0)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)